@@ -1,31 +1,122 @@
 from __future__ import annotations
 
-from typing import List
+import math
+from collections import Counter
+from typing import Any, Dict
 
+from .scoring import query_terms, tokenize
 
-def should_continue_crawling(
-    pages_so_far: List[str],  # markdown content of pages crawled so far
-    max_pages: int,
-    target_content_threshold: int = 5000,  # characters
-) -> bool:
+
+# BM25 term-frequency saturation and length normalization
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+# Evidence (summed BM25 tf weight) at which a query term counts as ~63% covered
+_TERM_SATURATION = 3.0
+# Query coverage below which low-gain pages do not count toward stopping
+_MIN_COVERAGE_TO_STOP = 0.25
+
+
+class AdaptiveStopper:
     """
-    Simple adaptive strategy: stop crawling if we have enough content
-    or hit the page limit.
-    
-    A more sophisticated version could use LLM-based information foraging
-    to determine if the query has been sufficiently answered.
+    Decides when a crawl has gathered enough, one page at a time.
+
+    Keeps incremental term statistics of the pages crawled so far (document frequency,
+    average length) and measures each new page's marginal information gain:
+
+    - with a `query`: the increase in query coverage. Every query term collects BM25
+      evidence (saturated term frequency, normalized by page length) from each page,
+      weighted by the term's IDF over the pages seen; coverage is the IDF-weighted
+      mean of 1 - exp(-evidence / saturation), from 0 (no term seen) to 1.
+    - without one: novelty, the share of the page's distinct terms not seen before.
+
+    Crawling stops once `patience` pages in a row gain less than `min_gain`, but never
+    before `get_adaptive_threshold(query)` characters have been gathered. With a query,
+    low-gain pages only count once coverage has reached `min_coverage`: pages that miss
+    the query before anything relevant was found say nothing about saturation, so such
+    a crawl runs on to its page budget.
     """
-    if len(pages_so_far) >= max_pages:
-        return False
-    
-    # Calculate total content gathered
-    total_content_chars = sum(len(content) for content in pages_so_far)
-    
-    # Stop if we have gathered enough content
-    if total_content_chars >= target_content_threshold:
-        return False
-    
-    return True
+
+    def __init__(
+        self,
+        query: str | None = None,
+        min_gain: float | None = None,
+        patience: int = 3,
+        min_content_chars: int | None = None,
+        min_coverage: float = _MIN_COVERAGE_TO_STOP,
+    ) -> None:
+        self.query = query
+        self.terms = query_terms(query)
+        self.min_gain = min_gain if min_gain is not None else (0.01 if self.terms else 0.05)
+        self.patience = max(1, patience)
+        self.min_coverage = min_coverage
+        self.min_content_chars = (
+            min_content_chars if min_content_chars is not None else get_adaptive_threshold(query)
+        )
+        self.pages = 0
+        self.content_chars = 0
+        self._total_len = 0
+        self._df: Counter[str] = Counter()
+        self._evidence: Dict[str, float] = {t: 0.0 for t in self.terms}
+        self.coverage = 0.0
+        self.last_gain = 0.0
+        self._low_gain_streak = 0
+
+    def _idf(self, term: str) -> float:
+        # Over the pages seen so far; a term on every page still weighs a little
+        return math.log(1.0 + (self.pages - self._df[term] + 0.5) / (self._df[term] + 0.5))
+
+    def _coverage(self) -> float:
+        if not self.terms:
+            return 0.0
+        weights = [self._idf(t) for t in self.terms]
+        total = sum(weights) or 1.0
+        return sum(
+            w * (1.0 - math.exp(-self._evidence[t] / _TERM_SATURATION)) for t, w in zip(self.terms, weights)
+        ) / total
+
+    def add_page(self, markdown: str) -> float:
+        """Index one crawled page; returns its marginal gain."""
+        counts = Counter(tokenize(markdown))
+        length = sum(counts.values())
+        novel = sum(1 for t in counts if t not in self._df)
+        self.pages += 1
+        self.content_chars += len(markdown)
+        self._total_len += length
+        self._df.update(counts.keys())
+
+        if self.terms:
+            # Before/after under the same IDFs, so IDF drift alone is not counted as gain
+            before = self._coverage()
+            avg_len = self._total_len / self.pages or 1.0
+            norm = _BM25_K1 * (1.0 - _BM25_B + _BM25_B * length / avg_len)
+            for t in self.terms:
+                tf = counts.get(t, 0)
+                if tf:
+                    self._evidence[t] += tf * (_BM25_K1 + 1.0) / (tf + norm)
+            self.coverage = self._coverage()
+            gain = self.coverage - before
+        else:
+            gain = novel / len(counts) if counts else 0.0
+
+        self.last_gain = gain
+        saturating = not self.terms or self.coverage >= self.min_coverage
+        self._low_gain_streak = self._low_gain_streak + 1 if gain < self.min_gain and saturating else 0
+        return gain
+
+    def should_continue(self) -> bool:
+        if self.content_chars < self.min_content_chars:
+            return True
+        return self._low_gain_streak < self.patience
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pages": self.pages,
+            "content_chars": self.content_chars,
+            "coverage": round(self.coverage, 4),
+            "last_gain": round(self.last_gain, 4),
+            "low_gain_streak": self._low_gain_streak,
+            "min_gain": self.min_gain,
+        }
 
 
 def get_adaptive_threshold(query: str | None = None) -> int:
@@ -35,7 +126,7 @@ def get_adaptive_threshold(query: str | None = None) -> int:
     """
     if not query:
         return 5000
-    
+
     # Simple heuristic: longer/more complex queries need more content
     if len(query) > 100 or "detailed" in query.lower() or "comprehensive" in query.lower():
         return 8000
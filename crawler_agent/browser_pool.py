@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List
+
+from crawl4ai import AsyncWebCrawler
+
+try:  # psutil ships with crawl4ai, but keep the pool usable without it
+    import psutil
+except ImportError:  # pragma: no cover - optional
+    psutil = None
+
+
+logger = logging.getLogger("crawl4ai_mcp")
+
+_MIN_PAGES_BEFORE_RSS_RECYCLE = 20
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _process_tree_rss_mb() -> float | None:
+    """Resident memory of this process plus its children (the Chromium processes), in MB."""
+    if psutil is None:
+        return None
+    try:
+        proc = psutil.Process()
+        total = proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class PooledCrawler:
+    """A warm AsyncWebCrawler handed out by CrawlerPool.
+
+    Exposes the same `arun` call as AsyncWebCrawler and counts pages so the pool can
+    recycle the underlying browser. Concurrent `arun` calls share the browser; when a
+    recycle is due, new calls wait until in-flight ones finish, the browser is restarted
+    once, and then fetching resumes.
+    """
+
+    def __init__(self, pool: "CrawlerPool") -> None:
+        self._pool = pool
+        self._crawler: AsyncWebCrawler | None = None
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+        self.pages = 0
+
+    @property
+    def started(self) -> bool:
+        return self._crawler is not None
+
+    @property
+    def load(self) -> int:
+        """Pages being fetched on this browser right now."""
+        return self._in_flight
+
+    async def start(self) -> None:
+        crawler = AsyncWebCrawler()
+        await crawler.start()
+        self._crawler = crawler
+        self.pages = 0
+
+    async def close(self) -> None:
+        crawler, self._crawler = self._crawler, None
+        if crawler is None:
+            return
+        try:
+            await crawler.close()
+        except Exception as e:
+            logger.warning("crawler close failed: %s", str(e))
+
+    async def _restart(self) -> None:
+        logger.info("recycling crawler after %d pages", self.pages)
+        await self.close()
+        await self.start()
+
+    async def arun(self, **kwargs: Any) -> Any:
+        async with self._cond:
+            while self._in_flight and self._pool.needs_recycle(self):
+                await self._cond.wait()
+            if self._crawler is None or self._pool.needs_recycle(self):
+                if self._crawler is None:
+                    await self.start()
+                else:
+                    await self._restart()
+            self._in_flight += 1
+            self.pages += 1
+            crawler = self._crawler
+        try:
+            return await crawler.arun(**kwargs)
+        finally:
+            async with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+
+class LazyLease:
+    """A run's handle on the pool; each page is fetched on the least-loaded pooled browser.
+
+    Nothing is reserved for the run, so long crawls never keep other tool calls waiting
+    for a browser. With pooling disabled the run launches its own browser when the first
+    page needs one (runs that fetch every page over plain HTTP never start one) and
+    closes it when the lease is closed.
+    """
+
+    def __init__(self, pool: "CrawlerPool") -> None:
+        self._pool = pool
+        self._own: PooledCrawler | None = None
+
+    async def arun(self, **kwargs: Any) -> Any:
+        if self._pool.size:
+            return await self._pool.least_loaded().arun(**kwargs)
+        if self._own is None:
+            self._own = PooledCrawler(self._pool)
+        return await self._own.arun(**kwargs)
+
+    async def aclose(self) -> None:
+        own, self._own = self._own, None
+        if own is not None:
+            await own.close()
+
+
+class CrawlerPool:
+    """Server-level pool of long-lived crawlers shared across MCP tool calls.
+
+    Browsers are launched once and reused, so a tool call only pays for the fetch. Up to
+    `size` browsers are shared by all runs: a page goes to the browser with the fewest
+    fetches in flight, and a new one is launched only while every browser is busy. A
+    crawler is recycled after `max_pages_per_crawler` pages, or when the process tree
+    exceeds `max_rss_mb` (requires psutil). Size 0 disables pooling: every lease gets a
+    fresh crawler that is closed on release, matching the old per-call behaviour.
+    """
+
+    def __init__(self, size: int = 2, max_pages_per_crawler: int = 500, max_rss_mb: int = 0) -> None:
+        self.size = max(0, size)
+        self.max_pages_per_crawler = max(1, max_pages_per_crawler)
+        self.max_rss_mb = max(0, max_rss_mb)
+        self._entries: List[PooledCrawler] = []
+        self._closed = False
+
+    @classmethod
+    def from_env(cls) -> "CrawlerPool":
+        return cls(
+            size=_env_int("CRAWL4AI_MCP_POOL_SIZE", 2),
+            max_pages_per_crawler=_env_int("CRAWL4AI_MCP_POOL_MAX_PAGES", 500),
+            max_rss_mb=_env_int("CRAWL4AI_MCP_POOL_MAX_RSS_MB", 0),
+        )
+
+    def needs_recycle(self, entry: PooledCrawler) -> bool:
+        if entry.pages >= self.max_pages_per_crawler:
+            return True
+        # Give a fresh browser some pages before judging it by memory, or it would thrash
+        if self.max_rss_mb and entry.pages >= _MIN_PAGES_BEFORE_RSS_RECYCLE:
+            rss = _process_tree_rss_mb()
+            if rss is not None and rss >= self.max_rss_mb:
+                return True
+        return False
+
+    async def start(self, warm: int = 1) -> None:
+        """Pre-launch up to `warm` crawlers so the first tool call finds a hot browser."""
+        self._closed = False
+        for _ in range(min(warm, self.size) - len(self._entries)):
+            entry = PooledCrawler(self)
+            try:
+                await entry.start()
+            except Exception as e:
+                logger.warning("crawler pool warm-up failed: %s", str(e))
+                return
+            self._entries.append(entry)
+        logger.info("crawler pool ready size=%d warm=%d", self.size, len(self._entries))
+
+    def least_loaded(self) -> PooledCrawler:
+        """The pooled crawler for the next page; it starts its browser on first use."""
+        if self._closed:
+            raise RuntimeError("crawler pool is closed")
+        entry = min(self._entries, key=lambda e: e.load, default=None)
+        if entry is None or (entry.load and len(self._entries) < self.size):
+            entry = PooledCrawler(self)
+            self._entries.append(entry)
+        return entry
+
+    @asynccontextmanager
+    async def acquire_lazy(self) -> AsyncIterator[LazyLease]:
+        lease = LazyLease(self)
+        try:
+            yield lease
+        finally:
+            await lease.aclose()
+
+    async def close(self) -> None:
+        self._closed = True
+        entries, self._entries = self._entries, []
+        for entry in entries:
+            await entry.close()
+        logger.info("crawler pool closed")
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import heapq
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+class Frontier:
+    """Breadth-first crawl frontier with O(1) push, pop and membership checks.
+
+    Every URL ever pushed is remembered, so a URL is enqueued at most once per run
+    whether it is still pending or already fetched. With a `key` (e.g. a URL
+    canonicalizer) URLs are remembered by key, so spellings of the same page count as
+    one; the queue keeps the URL as pushed. Pending URLs are counted per depth and the
+    peak queue size is kept for run stats.
+    """
+
+    def __init__(self, max_depth: int | None = None, key: Callable[[str], str] | None = None) -> None:
+        self.max_depth = max_depth
+        self._key = key or (lambda url: url)
+        self._queue: Deque[Tuple[str, int]] = deque()
+        self._seen: Set[str] = set()
+        self._pending_by_depth: Counter[int] = Counter()
+        self.pushed = 0
+        self.popped = 0
+        self.peak_size = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, url: str) -> bool:
+        return self._key(url) in self._seen
+
+    def push(self, url: str, depth: int, priority: float | None = None) -> bool:
+        """Enqueue `url` unless it was seen before or lies beyond max_depth.
+
+        `priority` only matters to a PriorityFrontier; breadth-first order ignores it.
+        """
+        key = self._key(url)
+        if key in self._seen:
+            return False
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        self._seen.add(key)
+        self._enqueue(url, depth, priority)
+        self._pending_by_depth[depth] += 1
+        self.pushed += 1
+        if len(self) > self.peak_size:
+            self.peak_size = len(self)
+        return True
+
+    def _enqueue(self, url: str, depth: int, priority: float | None) -> None:
+        self._queue.append((url, depth))
+
+    def _dequeue(self) -> Tuple[str, int]:
+        return self._queue.popleft()
+
+    def mark_seen(self, url: str) -> None:
+        """Record `url` as already handled so it is never enqueued."""
+        self._seen.add(self._key(url))
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        if not self:
+            return None
+        url, depth = self._dequeue()
+        self._pending_by_depth[depth] -= 1
+        if not self._pending_by_depth[depth]:
+            del self._pending_by_depth[depth]
+        self.popped += 1
+        return url, depth
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "pending": len(self),
+            "seen": len(self._seen),
+            "pushed": self.pushed,
+            "popped": self.popped,
+            "peak_size": self.peak_size,
+            "pending_by_depth": dict(sorted(self._pending_by_depth.items())),
+        }
+
+
+class PriorityFrontier(Frontier):
+    """Best-first frontier: pops the pending URL with the highest priority.
+
+    A binary heap keeps push and pop at O(log n). URLs pushed without a priority are
+    scored with `score(url, depth)` (by default, shallower first); ties go to the
+    shallower URL, then to the one pushed first. Dedupe, max_depth and stats work as in
+    Frontier.
+    """
+
+    def __init__(
+        self,
+        max_depth: int | None = None,
+        key: Callable[[str], str] | None = None,
+        score: Callable[[str, int], float] | None = None,
+    ) -> None:
+        super().__init__(max_depth=max_depth, key=key)
+        self._score = score or (lambda url, depth: -float(depth))
+        self._heap: List[Tuple[float, int, int, str]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _enqueue(self, url: str, depth: int, priority: float | None) -> None:
+        if priority is None:
+            priority = self._score(url, depth)
+        self._seq += 1
+        heapq.heappush(self._heap, (-priority, depth, self._seq, url))
+
+    def _dequeue(self) -> Tuple[str, int]:
+        _, depth, _, url = heapq.heappop(self._heap)
+        return url, depth
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import logging
+import os
+
+import httpx
+
+
+logger = logging.getLogger("crawl4ai_mcp")
+
+_client: httpx.AsyncClient | None = None
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """AsyncClient for lightweight (non-browser) fetches, configured from the environment."""
+    http2 = os.getenv("CRAWL4AI_MCP_HTTP2", "1").lower() not in ("0", "false", "no")
+    if http2 and not _http2_available():
+        logger.warning("CRAWL4AI_MCP_HTTP2 is on but the h2 package is missing; using HTTP/1.1")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=_env_int("CRAWL4AI_MCP_HTTP_MAX_CONNECTIONS", 100),
+        max_keepalive_connections=_env_int("CRAWL4AI_MCP_HTTP_MAX_KEEPALIVE", 20),
+        keepalive_expiry=_env_float("CRAWL4AI_MCP_HTTP_KEEPALIVE_S", 30.0),
+    )
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        timeout=_env_float("CRAWL4AI_MCP_HTTP_TIMEOUT_S", 10.0),
+        follow_redirects=True,
+    )
+
+
+def shared_http_client() -> httpx.AsyncClient:
+    """The process-wide client: robots.txt, sitemaps, revalidation and other plain HTTP fetches.
+
+    Connections are pooled and kept alive across tool calls, so repeat fetches to a host skip
+    the TCP/TLS handshake. The server opens it at startup and closes it on shutdown; outside
+    the server it is created on first use.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_http_client()
+    return _client
+
+
+async def open_http_client() -> None:
+    shared_http_client()
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
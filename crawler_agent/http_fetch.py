@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Literal
+from urllib.parse import urljoin, urlparse
+
+from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+
+from .http_client import shared_http_client
+
+
+FetchMode = Literal["browser", "http", "auto"]
+
+_MAX_HTML_BYTES = 10 * 1024 * 1024
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+# auto mode: what an empty SPA shell looks like before its JavaScript runs
+_MIN_TEXT_CHARS = 200
+_THIN_TEXT_CHARS = 1000
+_SPA_ROOT_RE = re.compile(
+    r"<div[^>]+id=[\"'](?:root|app|__next|__nuxt|svelte|q-app)[\"'][^>]*>\s*</div>", re.IGNORECASE
+)
+_NOSCRIPT_JS_RE = re.compile(r"<noscript[^>]*>[^<]*(?:enable|requires?|need)[^<]*javascript", re.IGNORECASE)
+
+_markdown_generator = DefaultMarkdownGenerator()
+
+
+class HttpFetchError(Exception):
+    """The page could not be fetched or converted without a browser."""
+
+
+@dataclass
+class HttpFetchResult:
+    """Plain-HTTP counterpart of a Crawl4AI result, with the fields the crawl tools read."""
+
+    url: str
+    html: str
+    markdown: str
+    links: Dict[str, List[Dict[str, str]]] = field(default_factory=dict)
+    status_code: int = 200
+    response_headers: Dict[str, str] = field(default_factory=dict)
+    success: bool = True
+
+
+class _LinkParser(HTMLParser):
+    def __init__(self, base_url: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.links: List[Dict[str, str]] = []
+        self._href: str | None = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[tuple[str, str | None]]) -> None:
+        if tag == "base" and not self.links:
+            href = dict(attrs).get("href")
+            if href:
+                self.base_url = urljoin(self.base_url, href)
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href and not href.startswith(("#", "javascript:", "mailto:", "tel:")):
+                self._href = urljoin(self.base_url, href)
+                self._text = []
+
+    def handle_data(self, data: str) -> None:
+        if self._href is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "a" and self._href is not None:
+            self.links.append({"href": self._href, "text": " ".join("".join(self._text).split())})
+            self._href = None
+
+
+def _classify_links(url: str, links: List[Dict[str, str]]) -> Dict[str, List[Dict[str, str]]]:
+    host = (urlparse(url).hostname or "").lower()
+    out: Dict[str, List[Dict[str, str]]] = {"internal": [], "external": []}
+    seen: set[str] = set()
+    for link in links:
+        if link["href"] in seen:
+            continue
+        seen.add(link["href"])
+        key = "internal" if (urlparse(link["href"]).hostname or "").lower() == host else "external"
+        out[key].append(link)
+    return out
+
+
+def html_to_markdown(html: str, url: str) -> tuple[str, Dict[str, List[Dict[str, str]]]]:
+    """Convert HTML with Crawl4AI's markdown generator; links come back in Crawl4AI's internal/external shape."""
+    parser = _LinkParser(url)
+    parser.feed(html)
+    parser.close()
+    result = _markdown_generator.generate_markdown(html, base_url=url, citations=False)
+    return result.raw_markdown or "", _classify_links(url, parser.links)
+
+
+def looks_js_rendered(html: str, markdown: str) -> bool:
+    """Heuristic for `auto` mode: does this page need a browser to show its content?"""
+    text = len(markdown.strip())
+    if text < _MIN_TEXT_CHARS:
+        return True
+    if text < _THIN_TEXT_CHARS and (_SPA_ROOT_RE.search(html) or _NOSCRIPT_JS_RE.search(html)):
+        return True
+    return False
+
+
+async def http_fetch(url: str, client: Any = None) -> HttpFetchResult:
+    """Fetch `url` without a browser and convert it to markdown in-process."""
+    client = client or shared_http_client()
+    async with client.stream("GET", url) as r:
+        if r.status_code != 200:
+            raise HttpFetchError(f"HTTP {r.status_code}")
+        content_type = r.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        if content_type and content_type not in _HTML_TYPES:
+            raise HttpFetchError(f"Unsupported content type: {content_type}")
+        chunks: List[bytes] = []
+        size = 0
+        async for chunk in r.aiter_bytes():
+            size += len(chunk)
+            if size > _MAX_HTML_BYTES:
+                raise HttpFetchError(f"Page larger than {_MAX_HTML_BYTES} bytes")
+            chunks.append(chunk)
+        html = b"".join(chunks).decode(r.encoding or "utf-8", errors="replace")
+        final_url = str(r.url)
+        headers = dict(r.headers)
+    # html2text is pure Python; keep large pages from stalling the event loop
+    markdown, links = await asyncio.to_thread(html_to_markdown, html, final_url)
+    return HttpFetchResult(url=final_url, html=html, markdown=markdown, links=links, response_headers=headers)
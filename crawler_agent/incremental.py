@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from .persistence import CACHE_DIR, SITEMAP_LOG, _atomic_write_text, file_lock
+from .resume import _read_ndjson
+from .sitemap_utils import SitemapEntry, parse_lastmod
+
+
+SITEMAP_RUNS_FILE = "sitemap_runs.json"
+
+
+def sitemap_record(entry: SitemapEntry, status: str) -> Dict[str, Any]:
+    """Line of a run's sitemap.ndjson: the entry's sitemap fields plus what this run did with it."""
+    return {
+        "url": entry.loc,
+        "lastmod": entry.lastmod,
+        "changefreq": entry.changefreq,
+        "priority": entry.priority,
+        "status": status,  # ok | unchanged
+    }
+
+
+def _runs_path(base_output_dir: Path) -> Path:
+    return base_output_dir / CACHE_DIR / SITEMAP_RUNS_FILE
+
+
+def _read_runs(base_output_dir: Path) -> Dict[str, str]:
+    path = _runs_path(base_output_dir)
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_sitemap_baseline(base_output_dir: Path, sitemap_url: str) -> Tuple[str | None, Dict[str, str | None]]:
+    """lastmod of every entry held by the last successful run of `sitemap_url` in this output_dir.
+
+    Returns (run_id, {url: lastmod}); (None, {}) if there is no earlier finished run. Entries the
+    earlier run fetched successfully or carried over as unchanged are part of the baseline;
+    failed ones are not, so they are fetched again.
+    """
+    run_id = _read_runs(base_output_dir).get(sitemap_url)
+    if not run_id:
+        return None, {}
+    log = base_output_dir / run_id / SITEMAP_LOG
+    if not log.exists():
+        return None, {}
+    baseline: Dict[str, str | None] = {}
+    for rec in _read_ndjson(log):
+        if isinstance(rec, dict) and isinstance(rec.get("url"), str) and rec.get("status") in ("ok", "unchanged"):
+            baseline[rec["url"]] = rec.get("lastmod")
+    return run_id, baseline
+
+
+def record_successful_run(base_output_dir: Path, sitemap_url: str, run_id: str) -> None:
+    """Make `run_id` the baseline for the next incremental run of `sitemap_url`."""
+    path = _runs_path(base_output_dir)
+    # Re-read under the lock so runs of other sitemaps finishing meanwhile are kept
+    with file_lock(path):
+        runs = _read_runs(base_output_dir)
+        runs[sitemap_url] = run_id
+        _atomic_write_text(path, json.dumps(runs, indent=2, ensure_ascii=False))
+
+
+def entry_changed(entry: SitemapEntry, baseline: Dict[str, str | None]) -> bool:
+    """True if `entry` is new or its lastmod advanced; entries without a comparable lastmod count as changed."""
+    if entry.loc not in baseline:
+        return True
+    new, old = parse_lastmod(entry.lastmod), parse_lastmod(baseline[entry.loc])
+    if new is None or old is None:
+        return True
+    return new > old
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Literal, Set
+from urllib.parse import urljoin, urlsplit
+
+
+LinkSource = Literal["structured", "markdown", "both"]
+
+# Bare or [text](url) URLs in markdown; brackets end a URL, parentheses are balanced later
+_MD_URL_RE = re.compile(r"https?://[^\s<>\"'\[\]]+")
+# Sentence punctuation and markdown emphasis stuck to the end of a bare URL
+_TRAILING_PUNCT = ".,;:!?*_~`"
+_HOST_RE = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*://(?:[^@/?#]*@)?(\[[^\]]*\]|[^:/?#]*)")
+
+
+def _host_of(url: str) -> str:
+    m = _HOST_RE.match(url)
+    return m.group(1).lower() if m else ""
+
+
+@dataclass
+class PageLinks:
+    """A page's outlinks, absolute and deduplicated, split into same-host and other-host links."""
+
+    internal: List[str] = field(default_factory=list)
+    external: List[str] = field(default_factory=list)
+    # Anchor text per link, where the source has it (structured links)
+    anchors: Dict[str, str] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.internal) + len(self.external)
+
+    def all(self) -> List[str]:
+        return self.internal + self.external
+
+    @classmethod
+    def from_urls(cls, base_url: str, urls: Iterable[str]) -> "PageLinks":
+        """Classify already-absolute URLs by host, e.g. links kept from an earlier fetch."""
+        host = _host_of(base_url)
+        links = cls()
+        for u in urls:
+            (links.internal if _host_of(u) == host else links.external).append(u)
+        return links
+
+
+class _Collector:
+    def __init__(self, base_url: str, key: Callable[[str], str] | None, external: bool) -> None:
+        self.base_url = base_url
+        self.host = _host_of(base_url)
+        self.key = key
+        self.external = external
+        self.seen: Set[str] = set()
+        self.links = PageLinks()
+
+    def add(self, href: str, internal: bool | None = None, text: str = "") -> None:
+        if not href.startswith(("http://", "https://")):
+            if href.startswith(("#", "javascript:", "mailto:", "tel:", "data:")):
+                return
+            href = urljoin(self.base_url, href)
+        if internal is None:
+            internal = _host_of(href) == self.host
+        if not internal and not self.external:
+            return
+        k = self.key(href) if self.key is not None else href
+        if k in self.seen:
+            return
+        self.seen.add(k)
+        (self.links.internal if internal else self.links.external).append(href)
+        if text:
+            self.links.anchors[href] = text
+
+
+def _href(link: Any) -> tuple[str | None, str]:
+    if isinstance(link, str):
+        return link, ""
+    if isinstance(link, dict):
+        href = link.get("href") or link.get("url")
+        text = link.get("text")
+        return (href if isinstance(href, str) else None), (text.strip() if isinstance(text, str) else "")
+    return None, ""
+
+
+def _balanced(url: str) -> str:
+    """`url` up to the first `)` it did not open, e.g. the one closing `[text](url)`.
+
+    Keeps parentheses that belong to the URL, as in `/wiki/Foo_(bar)`.
+    """
+    if ")" not in url:
+        return url
+    depth = 0
+    for i, ch in enumerate(url):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            if not depth:
+                return url[:i]
+            depth -= 1
+    return url
+
+
+def markdown_urls(markdown: str) -> Iterable[str]:
+    """Absolute http(s) URLs in markdown text, with trailing punctuation removed."""
+    for m in _MD_URL_RE.finditer(markdown):
+        url = _balanced(m.group(0)).rstrip(_TRAILING_PUNCT)
+        if urlsplit(url).hostname:
+            yield url
+
+
+def extract_links(
+    base_url: str,
+    result: Any,
+    source: LinkSource = "structured",
+    key: Callable[[str], str] | None = None,
+    external: bool = True,
+) -> PageLinks:
+    """Outlinks of a crawl result in one pass, deduplicated by `key`.
+
+    `structured` reads `result.links`: Crawl4AI's `{"internal": [...], "external": [...]}`
+    dict keeps its classification and its already-absolute hrefs are used as they are; a
+    plain list of links is classified by host. `markdown` scans the page markdown for URLs
+    instead (for results without structured links), and `both` takes the union. With
+    `external=False` other-host links are dropped before they are keyed.
+    """
+    collector = _Collector(base_url, key, external)
+    if source in ("structured", "both"):
+        raw = getattr(result, "links", None) or []
+        if isinstance(raw, dict):
+            for kind in ("internal", "external") if external else ("internal",):
+                internal = kind == "internal"
+                for link in raw.get(kind) or []:
+                    href, text = _href(link)
+                    if href:
+                        collector.add(href, internal, text)
+        else:
+            for link in raw:
+                href, text = _href(link)
+                if href:
+                    collector.add(href, text=text)
+    if source in ("markdown", "both"):
+        for url in markdown_urls(str(getattr(result, "markdown", "") or "")):
+            collector.add(url)
+    return collector.links
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import asyncio
 import json
-import re
 import time
 import os
 import sys
@@ -11,8 +10,9 @@ import io
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Annotated, Any, Callable, Dict, List, Optional
 
+import httpx
 from pydantic import BaseModel, Field, HttpUrl
 
 from mcp import types
@@ -22,23 +22,39 @@ import mcp.server.stdio
 
 from urllib.parse import urlparse, urljoin
 
-from crawl4ai import AsyncWebCrawler
-
+from .browser_pool import CrawlerPool
+from .frontier import Frontier, PriorityFrontier
+from .http_fetch import FetchMode, HttpFetchError, HttpFetchResult, http_fetch, looks_js_rendered
+from .http_client import close_http_client, open_http_client
+from .incremental import entry_changed, load_sitemap_baseline, record_successful_run, sitemap_record
+from .links import LinkSource, PageLinks, extract_links
+from .neardup import NearDuplicateIndex, NearDuplicateMode, simhash
+from .pipeline import run_bounded
+from .politeness import HostScheduler
+from .revalidate import Revalidator
+from .scoring import FrontierStrategy, UrlScorer
+from .robots import RobotsCache, RobotsMode
+from .resume import RunState, load_run_state, resolve_run_dir
 from .safety import require_public_http_url
-from .adaptive_strategy import should_continue_crawling
+from .urlfilter import UrlFilter
+from .urlnorm import DEFAULT_STRIP_PARAMS, UrlCanonicalizer, declared_canonical
+from .adaptive_strategy import AdaptiveStopper
 from .persistence import (
     Manifest,
+    AsyncRunWriter,
+    ContentStore,
     PageRecord,
-    append_jsonl,
+    PagesLayout,
+    RunWriter,
+    content_digest,
     append_links_csv,
     ensure_run_dir,
     generate_run_id,
     persist_page_markdown,
-    update_totals,
     write_manifest,
-    append_log_jsonl,
 )
-from .sitemap_utils import discover_sitemaps, parse_sitemap_xml, filter_urls, fetch_text
+from .sitemap_stream import SitemapStream
+from .sitemap_utils import SitemapEntry, discover_sitemaps
 
 # Configure stderr logging (stdout is reserved for MCP stdio messages)
 _LOG_LEVEL = os.getenv("CRAWL4AI_MCP_LOG", "INFO").upper()
@@ -51,19 +67,52 @@ logger.setLevel(_LOG_LEVEL)
 logger.propagate = False
 
 
+class _NullWriter(io.TextIOBase):
+    def write(self, s: str) -> int:
+        return len(s)
+
+
 # Supresor de output de Crawl4AI para evitar warnings en MCP stdio
+# Reentrante: con fetches concurrentes, solo el primero redirige y el ultimo restaura stdout
 class SuppressCrawl4AIOutput:
+    _depth = 0
+    _stdout = None
+
     def __enter__(self):
-        self._stdout = sys.stdout
-        sys.stdout = io.StringIO()
+        cls = type(self)
+        if cls._depth == 0:
+            cls._stdout = sys.stdout
+            sys.stdout = _NullWriter()
+        cls._depth += 1
         return self
     
     def __exit__(self, *args):
-        sys.stdout = self._stdout
+        cls = type(self)
+        cls._depth -= 1
+        if cls._depth == 0:
+            sys.stdout = cls._stdout
 
 
 server = Server("crawl4ai-mcp")
 
+# Warm crawlers shared by every tool call; started and closed with the stdio server
+crawler_pool = CrawlerPool.from_env()
+
+# robots.txt rules per host, kept across tool calls for CRAWL4AI_MCP_ROBOTS_TTL_S
+robots_cache = RobotsCache.from_env()
+
+
+# Arguments several tools share, each defined once
+FetchModeArg = Annotated[FetchMode, Field(description="browser: render every page in Chromium; http: plain HTTP fetch + in-process markdown; auto: http, falling back to the browser for JS-rendered pages")]
+StripParamsArg = Annotated[List[str], Field(description="Query parameters ignored when deciding whether two URLs are the same page; a trailing * matches a prefix")]
+LinkSourceArg = Annotated[LinkSource, Field(description="structured: links Crawl4AI extracted from the HTML; markdown: URLs found in the page markdown; both: their union")]
+StrategyArg = Annotated[FrontierStrategy, Field(description="bfs: fetch pages level by level; best_first: fetch the most promising pending URL first (depth, include-pattern matches, relevance to query)")]
+PagesLayoutArg = Annotated[PagesLayout, Field(description="flat: pages/<name>.md; sharded: pages/ab/cd/<name>.md for very large runs")]
+DedupeStoreArg = Annotated[bool, Field(description="Store page markdown once per content hash in <output_dir>/_store, shared across runs")]
+ResumeRunIdArg = Annotated[Optional[str], Field(description="Continue an interrupted run in output_dir instead of starting a new one")]
+RevalidateArg = Annotated[bool, Field(description="Send a conditional request (ETag/Last-Modified from earlier runs) and reuse stored markdown on 304")]
+RobotsModeArg = Annotated[RobotsMode, Field(description="enforce: skip URLs robots.txt disallows; warn: fetch them but log a warning; ignore: do not read robots.txt")]
+
 
 class ScrapeArgs(BaseModel):
     url: HttpUrl
@@ -72,6 +121,7 @@ class ScrapeArgs(BaseModel):
     script: Optional[str] = Field(default=None, description="Optional C4A-Script")
     timeout_sec: Optional[int] = Field(default=45, ge=1, le=600)
     output_dir: Optional[str] = Field(default=None, description="If provided, persist to disk and return metadata only")
+    fetch_mode: FetchModeArg = "browser"
 
 
 class ScrapeResult(BaseModel):
@@ -88,12 +138,20 @@ class CrawlArgs(BaseModel):
     same_domain_only: bool = True
     include_patterns: List[str] = Field(default_factory=list)
     exclude_patterns: List[str] = Field(default_factory=list)
-    adaptive: bool = Field(default=False, description="Enable adaptive crawling to stop when sufficient info is gathered")
+    adaptive: bool = Field(default=False, description="Stop once new pages stop adding information (coverage of query, or new terms without one)")
     crawler: Dict[str, Any] = Field(default_factory=dict)
     browser: Dict[str, Any] = Field(default_factory=dict)
     script: Optional[str] = None
     timeout_sec: Optional[int] = Field(default=60, ge=1, le=900)
     output_dir: Optional[str] = Field(default=None, description="If provided, persist to disk and return metadata only")
+    pages_layout: PagesLayoutArg = "flat"
+    dedupe_store: DedupeStoreArg = False
+    resume_run_id: ResumeRunIdArg = None
+    fetch_mode: FetchModeArg = "browser"
+    strip_params: StripParamsArg = Field(default_factory=lambda: list(DEFAULT_STRIP_PARAMS))
+    link_source: LinkSourceArg = "structured"
+    strategy: StrategyArg = "bfs"
+    query: Optional[str] = Field(default=None, description="What the crawl is looking for; best_first favors links whose anchor text or URL mention it, adaptive stops once it is covered")
 
 
 class CrawlPage(BaseModel):
@@ -117,10 +175,23 @@ class CrawlSiteArgs(BaseModel):
     include_patterns: List[str] = Field(default_factory=list)
     exclude_patterns: List[str] = Field(default_factory=list)
     formats: List[str] = Field(default_factory=lambda: ["md", "jsonl"])  # md,jsonl,links_csv
-    adaptive: bool = False
-    respect_robots: str = Field(default="enforce")  # enforce|warn|ignore (placeholder)
+    pages_layout: PagesLayoutArg = "flat"
+    dedupe_store: DedupeStoreArg = False
+    resume_run_id: ResumeRunIdArg = None
+    revalidate: RevalidateArg = False
+    strip_params: StripParamsArg = Field(default_factory=lambda: list(DEFAULT_STRIP_PARAMS))
+    link_source: LinkSourceArg = "structured"
+    strategy: StrategyArg = "bfs"
+    query: Optional[str] = Field(default=None, description="What the crawl is looking for; best_first favors links whose anchor text or URL mention it, adaptive stops once it is covered")
+    sitemap_priority: bool = Field(default=False, description="best_first: also weigh each URL's <priority> from the site's sitemap")
+    honor_canonical: bool = Field(default=False, description="Treat a page's <link rel=canonical> target as already crawled")
+    near_duplicates: NearDuplicateMode = Field(default="off", description="off: no check; mark: flag pages whose content nearly matches an earlier page of the run and do not follow their links; skip: same, and do not store them")
+    near_duplicate_distance: int = Field(default=6, ge=0, le=12, description="SimHash bits (of 64) two pages may differ in and still count as near-duplicates")
+    adaptive: bool = Field(default=False, description="Stop once new pages stop adding information (coverage of query, or new terms without one)")
+    respect_robots: RobotsModeArg = "enforce"
     politeness_delay_ms: int = 500
-    max_concurrency: int = 2
+    max_concurrency: int = Field(default=2, ge=1, le=32, description="Pages fetched in parallel through one shared browser")
+    fetch_mode: FetchModeArg = "browser"
     timeout_sec: int = 600
 
 
@@ -131,8 +202,19 @@ class CrawlSitemapArgs(BaseModel):
     include_patterns: List[str] = Field(default_factory=list)
     exclude_patterns: List[str] = Field(default_factory=list)
     formats: List[str] = Field(default_factory=lambda: ["md", "jsonl"])  # md,jsonl,links_csv
+    pages_layout: PagesLayoutArg = "flat"
+    dedupe_store: DedupeStoreArg = False
+    resume_run_id: ResumeRunIdArg = None
+    revalidate: RevalidateArg = False
+    incremental: bool = Field(default=False, description="Fetch only entries that are new or whose <lastmod> advanced since the last finished run of this sitemap in output_dir")
+    sitemap_max_depth: int = Field(default=3, ge=0, le=10, description="How many levels of nested sitemap indexes to expand")
+    max_sitemaps: int = Field(default=500, ge=1, le=50000, description="Maximum sitemap documents (root, indexes and children) to download")
+    respect_robots: RobotsModeArg = "enforce"
+    strip_params: StripParamsArg = Field(default_factory=lambda: list(DEFAULT_STRIP_PARAMS))
+    link_source: LinkSourceArg = "structured"
     politeness_delay_ms: int = 500
-    max_concurrency: int = 2
+    max_concurrency: int = Field(default=2, ge=1, le=32, description="Pages fetched in parallel through one shared browser")
+    fetch_mode: FetchModeArg = "browser"
     timeout_sec: int = 900
 
 
@@ -172,7 +254,8 @@ async def list_tools() -> List[types.Tool]:
         types.Tool(
             name="crawl",
             description=(
-                "Breadth-first crawl up to max_depth starting from seed_url. Returns markdown per page by default. "
+                "Crawl up to max_depth starting from seed_url, breadth-first by default or most promising URL "
+                "first with strategy=\"best_first\". Returns markdown per page by default. "
                 "If output_dir provided, persists to disk and returns metadata only (avoids context bloat). "
                 "Respects same_domain_only and allows include/exclude regex patterns."
             ),
@@ -198,21 +281,9 @@ async def list_tools() -> List[types.Tool]:
 
 async def _run_scrape(args: ScrapeArgs) -> ScrapeResult:
     require_public_http_url(str(args.url))
-    async with AsyncWebCrawler() as crawler:
-        with SuppressCrawl4AIOutput():
-            result = await crawler.arun(
-                url=str(args.url),
-                script=args.script,
-            )
-    links = []
-    raw_links = getattr(result, "links", []) or []
-    for link in raw_links:
-        if isinstance(link, str):
-            links.append(link)
-        else:
-            href = link.get("href") or link.get("url")
-            if isinstance(href, str):
-                links.append(href)
+    async with crawler_pool.acquire_lazy() as crawler:
+        result = await _fetch_page(crawler, str(args.url), args.fetch_mode, script=args.script)
+    links = extract_links(str(args.url), result).all()
     return ScrapeResult(url=str(args.url), markdown=result.markdown or "", links=links, metadata={})
 
 
@@ -232,30 +303,18 @@ async def _persist_scrape(args: ScrapeArgs) -> ScrapePersistResult:
         started_at=started_at.isoformat(),
         config=args.model_dump(),
     )
-    write_manifest(run_dir, manifest)
+    await asyncio.to_thread(write_manifest, run_dir, manifest)
     
     # Scrape the content
-    async with AsyncWebCrawler() as crawler:
-        with SuppressCrawl4AIOutput():
-            result = await crawler.arun(
-                url=str(args.url),
-                script=args.script,
-            )
+    async with crawler_pool.acquire_lazy() as crawler:
+        result = await _fetch_page(crawler, str(args.url), args.fetch_mode, script=args.script)
     
     # Process links
-    links = []
-    raw_links = getattr(result, "links", []) or []
-    for link in raw_links:
-        if isinstance(link, str):
-            links.append(link)
-        else:
-            href = link.get("href") or link.get("url")
-            if isinstance(href, str):
-                links.append(href)
+    links = extract_links(str(args.url), result).all()
     
     # Persist to disk
     markdown = result.markdown or ""
-    file_path, content_bytes = persist_page_markdown(run_dir, str(args.url), markdown)
+    file_path, content_bytes = await asyncio.to_thread(persist_page_markdown, run_dir, str(args.url), markdown)
     page_record = PageRecord(
         url=str(args.url),
         status="ok",
@@ -269,11 +328,11 @@ async def _persist_scrape(args: ScrapeArgs) -> ScrapePersistResult:
     manifest.pages = [page_record]
     manifest.finished_at = datetime.now(timezone.utc).isoformat()
     manifest.totals = {"pages_ok": 1, "pages_failed": 0, "bytes_written": page_record.content_bytes}
-    write_manifest(run_dir, manifest)
+    await asyncio.to_thread(write_manifest, run_dir, manifest)
     
     # Log and save links if any
     if links:
-        append_links_csv(run_dir, str(args.url), links)
+        await asyncio.to_thread(append_links_csv, run_dir, str(args.url), links)
     
     logger.info("persist_scrape done run_id=%s file=%s bytes=%d", run_id, Path(file_path).name, page_record.content_bytes)
     
@@ -288,190 +347,245 @@ async def _persist_scrape(args: ScrapeArgs) -> ScrapePersistResult:
     )
 
 
-def _compile_patterns(patterns: List[str]) -> List[re.Pattern[str]]:
-    compiled: List[re.Pattern[str]] = []
-    for p in patterns:
-        try:
-            compiled.append(re.compile(p))
-        except re.error:
-            continue
-    return compiled
-
-
-def _url_allowed(url: str, seed_host: str, same_domain_only: bool, include: List[re.Pattern[str]], exclude: List[re.Pattern[str]]) -> bool:
-    try:
-        require_public_http_url(url)
-    except ValueError:
-        return False
-
-    parsed = urlparse(url)
-    if same_domain_only and parsed.hostname and parsed.hostname != seed_host:
-        return False
-    text = url
-    if include and not any(p.search(text) for p in include):
-        return False
-    if any(p.search(text) for p in exclude):
-        return False
-    return True
-
+async def _open_run(args: Any, prefix: str, mode: str, entry: str) -> tuple[str, Path, Manifest, RunState | None]:
+    """Start a new persisted run, or reopen `args.resume_run_id` with its recovered state."""
+    if args.resume_run_id:
+        run_dir = resolve_run_dir(args.output_dir, args.resume_run_id)
+        state = await asyncio.to_thread(load_run_state, run_dir)
+        if state.manifest.mode != mode:
+            raise ValueError(f"Cannot resume {state.manifest.mode} run {args.resume_run_id!r} as {mode}")
+        logger.info("resume run_id=%s done=%d pending=%d", args.resume_run_id, len(state.done), len(state.pending))
+        return args.resume_run_id, run_dir, state.manifest, state
 
-def _extract_links_from_result(base_url: str, result: Any) -> List[str]:
-    links: List[str] = []
-    raw_links = getattr(result, "links", []) or []
-    for link in raw_links:
-        if isinstance(link, str):
-            candidate = link
+    run_id = generate_run_id(prefix)
+    run_dir = ensure_run_dir(args.output_dir, run_id)
+    manifest = Manifest(
+        run_id=run_id,
+        entry=entry,
+        mode=mode,
+        started_at=datetime.now(timezone.utc).isoformat(),
+        config=args.model_dump(),
+    )
+    return run_id, run_dir, manifest, None
+
+
+async def _open_run_writer(
+    run_dir: Path, args: Any, manifest: Manifest | None = None, resumed: bool = False
+) -> AsyncRunWriter:
+    store = ContentStore(run_dir.parent) if args.dedupe_store else None
+    out = AsyncRunWriter(RunWriter(run_dir, pages_layout=args.pages_layout, store=store), manifest)
+    if resumed:
+        await out.call(out.out.names.scan)
+    return out
+
+
+async def _log_store_stats(out: AsyncRunWriter) -> None:
+    """Log how many pages the run added to the shared content store and how many it found there."""
+    store = out.out.store
+    if store is not None:
+        # The counts change on the writer thread; read them after the queued puts
+        stats = await out.call(store.stats)
+        await out.append_log({"event": "store_stats", **stats, "ts": time.time()})
+
+
+def _build_frontier(
+    args: CrawlArgs | CrawlSiteArgs,
+    canonical: UrlCanonicalizer,
+    sitemap_priorities: Dict[str, float] | None = None,
+) -> tuple[Frontier, UrlScorer | None]:
+    """The run's frontier, and the scorer links are pushed with under best_first."""
+    if args.strategy != "best_first":
+        return Frontier(max_depth=args.max_depth, key=canonical), None
+    scorer = UrlScorer(args.query, args.include_patterns, sitemap_priorities, key=canonical)
+    return PriorityFrontier(max_depth=args.max_depth, key=canonical, score=scorer), scorer
+
+
+def _push_links(
+    frontier: Frontier, scorer: UrlScorer | None, links: PageLinks, urls: List[str], depth: int
+) -> List[tuple[str, int]]:
+    """Push `urls` (found on a page with `links`) at `depth`; returns the ones newly enqueued."""
+    pushed: List[tuple[str, int]] = []
+    for href in urls:
+        # Only score links the frontier has not seen
+        if href in frontier:
+            continue
+        priority = scorer(href, depth, links.anchors.get(href, "")) if scorer is not None else None
+        if frontier.push(href, depth, priority):
+            pushed.append((href, depth))
+    return pushed
+
+
+async def _load_sitemap_priorities(
+    entry_url: str, accept: Callable[[str], bool], key: Callable[[str], str], into: Dict[str, float]
+) -> None:
+    """Fill `into` with the <priority> of the site's sitemap URLs (by `key`) as they stream in."""
+    for sitemap_url in await discover_sitemaps(entry_url):
+        stream = SitemapStream(sitemap_url, accept=accept, limit=_SITEMAP_PRIORITY_LIMIT, key=key)
+        stream.start()
+        try:
+            while True:
+                entry = await stream.next()
+                if entry is None:
+                    break
+                if entry.priority is not None:
+                    into[key(entry.loc)] = entry.priority
+        finally:
+            await stream.aclose()
+
+
+def _seed_frontier(frontier: Frontier, entry: str, state: RunState | None) -> List[tuple[str, int]]:
+    """Fill the frontier for a new or resumed run; returns the entries that still need logging."""
+    if state is not None:
+        for url in state.done:
+            frontier.mark_seen(url)
+        for url, depth in state.pending:
+            frontier.push(url, depth)
+    return [(entry, 0)] if frontier.push(entry, 0) else []
+
+
+async def _fetch_page(crawler: Any, url: str, fetch_mode: FetchMode, script: str | None = None) -> Any:
+    """Fetch `url` the way `fetch_mode` asks; a C4A `script` always runs in the browser.
+
+    Returns a Crawl4AI result or an HttpFetchResult; both carry `markdown`, `links` and
+    `response_headers`. In auto mode a page that fails over plain HTTP, or looks like an
+    empty JavaScript shell, is fetched again with the browser.
+    """
+    if fetch_mode != "browser" and not script:
+        try:
+            result = await http_fetch(url)
+        except (HttpFetchError, httpx.HTTPError):
+            if fetch_mode == "http":
+                raise
         else:
-            candidate = link.get("href") or link.get("url")
-        if isinstance(candidate, str):
-            links.append(candidate)
-    # Also extract absolute URLs from markdown content
-    md = getattr(result, "markdown", "") or ""
-    if md:
-        for match in re.findall(r"https?://[^\s)\]]+", md):
-            links.append(match)
-    # Normalize and de-duplicate
-    dedup: List[str] = []
-    seen: Set[str] = set()
-    for u in links:
-        # Resolve relative links if any
-        abs_u = urljoin(base_url, u)
-        if abs_u not in seen:
-            seen.add(abs_u)
-            dedup.append(abs_u)
-    return dedup
+            if fetch_mode == "http" or not looks_js_rendered(result.html, result.markdown):
+                return result
+    kwargs: Dict[str, Any] = {"url": url}
+    if script:
+        kwargs["script"] = script
+    with SuppressCrawl4AIOutput():
+        return await crawler.arun(**kwargs)
 
 
 async def _run_crawl(args: CrawlArgs) -> CrawlResult:
     require_public_http_url(str(args.seed_url))
     seed_host = urlparse(str(args.seed_url)).hostname or ""
-    include = _compile_patterns(args.include_patterns)
-    exclude = _compile_patterns(args.exclude_patterns)
+    url_filter = UrlFilter(args.include_patterns, args.exclude_patterns, seed_host, args.same_domain_only)
 
-    visited: Set[str] = set()
-    frontier: List[tuple[str, int]] = [(str(args.seed_url), 0)]
+    canonical = UrlCanonicalizer(args.strip_params)
+    frontier, scorer = _build_frontier(args, canonical)
+    frontier.push(str(args.seed_url), 0)
     pages: List[CrawlPage] = []
+    stopper = AdaptiveStopper(args.query) if args.adaptive else None
 
-    async with AsyncWebCrawler() as crawler:
+    async with crawler_pool.acquire_lazy() as crawler:
         while frontier and len(pages) < args.max_pages:
-            url, depth = frontier.pop(0)
-            if url in visited:
-                continue
-            visited.add(url)
+            url, depth = frontier.pop()
 
-            with SuppressCrawl4AIOutput():
-                result = await crawler.arun(url=url, script=args.script)
-            page_links: List[str] = _extract_links_from_result(url, result)
+            result = await _fetch_page(crawler, url, args.fetch_mode, script=args.script)
+            page_links = extract_links(url, result, args.link_source, key=canonical)
 
-            pages.append(CrawlPage(url=url, markdown=result.markdown or "", links=page_links))
+            pages.append(CrawlPage(url=url, markdown=result.markdown or "", links=page_links.all()))
 
-            if args.adaptive:
-                page_contents = [page.markdown for page in pages]
-                if not should_continue_crawling(page_contents, args.max_pages):
+            if stopper is not None:
+                stopper.add_page(pages[-1].markdown)
+                if not stopper.should_continue():
+                    logger.info("crawl adaptive stop url=%s %s", url, stopper.stats())
                     break
 
-            if depth + 1 <= args.max_depth:
-                for href in page_links:
-                    if len(pages) >= args.max_pages:
-                        break
-                    if _url_allowed(href, seed_host, args.same_domain_only, include, exclude):
-                        if href not in visited and all(href != u for u, _ in frontier):
-                            frontier.append((href, depth + 1))
+            if depth + 1 <= args.max_depth and len(pages) < args.max_pages:
+                candidates = page_links.internal if args.same_domain_only else page_links.all()
+                _push_links(frontier, scorer, page_links, url_filter.filter(candidates), depth + 1)
 
     return CrawlResult(start_url=str(args.seed_url), pages=pages, total_pages=len(pages))
 
 
 async def _persist_crawl(args: CrawlArgs) -> CrawlPersistResult:
     require_public_http_url(str(args.seed_url))
-    run_id = generate_run_id("crawl")
+    run_id, run_dir, manifest, state = await _open_run(args, "crawl", "crawl", str(args.seed_url))
     logger.info("persist_crawl start run_id=%s seed=%s depth=%d pages=%d", run_id, str(args.seed_url), args.max_depth, args.max_pages)
     
-    run_dir = ensure_run_dir(args.output_dir, run_id)
-    started_at = datetime.now(timezone.utc)
-    
     # Create manifest
-    manifest = Manifest(
-        run_id=run_id,
-        entry=str(args.seed_url),
-        mode="crawl",
-        started_at=started_at.isoformat(),
-        config=args.model_dump(),
-    )
-    write_manifest(run_dir, manifest)
+    await asyncio.to_thread(write_manifest, run_dir, manifest)
     
     # Crawl logic (same as _run_crawl but with persistence)
     seed_host = urlparse(str(args.seed_url)).hostname or ""
-    include = _compile_patterns(args.include_patterns)
-    exclude = _compile_patterns(args.exclude_patterns)
+    url_filter = UrlFilter(args.include_patterns, args.exclude_patterns, seed_host, args.same_domain_only)
+    
+    canonical = UrlCanonicalizer(args.strip_params)
+    frontier, scorer = _build_frontier(args, canonical)
+    seeded = _seed_frontier(frontier, str(args.seed_url), state)
+    pages_ok = manifest.totals.get("pages_ok", 0)
+    pages_failed = manifest.totals.get("pages_failed", 0)
+    total_bytes = manifest.totals.get("bytes_written", 0)
     
-    visited: Set[str] = set()
-    frontier: List[tuple[str, int]] = [(str(args.seed_url), 0)]
-    pages_ok = 0
-    pages_failed = 0
-    total_bytes = 0
+    stopper = AdaptiveStopper(args.query) if args.adaptive else None
     
-    async with AsyncWebCrawler() as crawler:
-        while frontier and len(visited) < args.max_pages:
-            url, depth = frontier.pop(0)
-            if url in visited or depth > args.max_depth:
-                continue
-            visited.add(url)
+    out = await _open_run_writer(run_dir, args, resumed=state is not None)
+    try:
+        await out.append_frontier(seeded)
+        async with crawler_pool.acquire_lazy() as crawler:
+            while frontier and pages_ok + pages_failed < args.max_pages:
+                if stopper is not None and not stopper.should_continue():
+                    await out.append_log({"event": "adaptive_stop", **stopper.stats(), "ts": time.time()})
+                    break
+                url, depth = frontier.pop()
             
-            try:
-                logger.debug("crawling url=%s depth=%d", url, depth)
-                with SuppressCrawl4AIOutput():
-                    result = await crawler.arun(url=url, script=args.script)
-                markdown = result.markdown or ""
+                try:
+                    logger.debug("crawling url=%s depth=%d", url, depth)
+                    result = await _fetch_page(crawler, url, args.fetch_mode, script=args.script)
+                    markdown = result.markdown or ""
                 
-                # Persist page
-                file_path, content_bytes = persist_page_markdown(run_dir, url, markdown)
-                page_record = PageRecord(
-                    url=url,
-                    status="ok",
-                    error=None,
-                    duration_ms=0,  # We don't track timing in this simplified version
-                    path=file_path,
-                    content_bytes=content_bytes
-                )
-                total_bytes += page_record.content_bytes
+                    # Persist page
+                    file_path, content_bytes = await out.write_page(url, markdown)
+                    page_record = PageRecord(
+                        url=url,
+                        status="ok",
+                        error=None,
+                        duration_ms=0,  # We don't track timing in this simplified version
+                        path=file_path,
+                        content_bytes=content_bytes
+                    )
+                    total_bytes += page_record.content_bytes
                 
-                # Save to manifest
-                append_jsonl(run_dir, page_record.model_dump())
-                pages_ok += 1
+                    # Save to manifest
+                    await out.append_jsonl(page_record.model_dump())
+                    pages_ok += 1
                 
-                # Extract and save links
-                links = _extract_links_from_result(url, result)
-                if links:
-                    append_links_csv(run_dir, url, links)
+                    # Extract and save links
+                    page_links = extract_links(url, result, args.link_source, key=canonical)
+                    links = page_links.all()
+                    if links:
+                        await out.append_links_csv(url, links)
                 
-                logger.info("crawled url=%s depth=%d bytes=%d", url, depth, page_record.content_bytes)
+                    logger.info("crawled url=%s depth=%d bytes=%d", url, depth, page_record.content_bytes)
+                    if stopper is not None:
+                        stopper.add_page(markdown)
                 
-                # Add new URLs to frontier if not at max depth
-                if depth < args.max_depth:
-                    for href in links:
-                        if args.adaptive and should_continue_crawling(len(visited), args.max_pages):
-                            break
-                        if _url_allowed(href, seed_host, args.same_domain_only, include, exclude):
-                            if href not in visited and all(href != u for u, _ in frontier):
-                                frontier.append((href, depth + 1))
+                    # Add new URLs to frontier if not at max depth
+                    if depth < args.max_depth:
+                        candidates = page_links.internal if args.same_domain_only else links
+                        await out.append_frontier(_push_links(frontier, scorer, page_links, url_filter.filter(candidates), depth + 1))
                                 
-            except Exception as e:
-                logger.warning("failed to crawl url=%s: %s", url, str(e))
-                page_record = PageRecord(
-                    url=url,
-                    status="failed",
-                    error=str(e),
-                    duration_ms=0,
-                    path=None,
-                    content_bytes=None
-                )
-                append_jsonl(run_dir, page_record.model_dump())
-                pages_failed += 1
+                except Exception as e:
+                    logger.warning("failed to crawl url=%s: %s", url, str(e))
+                    page_record = PageRecord(
+                        url=url,
+                        status="failed",
+                        error=str(e),
+                        duration_ms=0,
+                        path=None,
+                        content_bytes=None
+                    )
+                    await out.append_jsonl(page_record.model_dump())
+                    pages_failed += 1
+        await _log_store_stats(out)
+    finally:
+        await out.aclose()
     
     # Update manifest with final results
     manifest.finished_at = datetime.now(timezone.utc).isoformat()
     manifest.totals = {"pages_ok": pages_ok, "pages_failed": pages_failed, "bytes_written": total_bytes}
-    write_manifest(run_dir, manifest)
+    await asyncio.to_thread(write_manifest, run_dir, manifest)
     
     logger.info("persist_crawl done run_id=%s pages_ok=%d pages_failed=%d bytes=%d", run_id, pages_ok, pages_failed, total_bytes)
     
@@ -482,89 +596,283 @@ async def _persist_crawl(args: CrawlArgs) -> CrawlPersistResult:
         pages_ok=pages_ok,
         pages_failed=pages_failed,
         bytes_written=total_bytes,
-        started_at=started_at.isoformat(),
+        started_at=manifest.started_at,
         finished_at=manifest.finished_at
     )
 
 
+@dataclass
+class _FetchOptions:
+    """Per-run settings of _fetch_and_record."""
+
+    fetch_mode: FetchMode = "browser"
+    # Conditional re-fetch cache; a 304 reuses the markdown of an earlier run
+    revalidator: Revalidator | None = None
+    # Dedupe key for a page's links (URL canonicalizer)
+    canonicalize: Callable[[str], str] | None = None
+    link_source: LinkSource = "structured"
+    # False: drop other-host links at extraction (same-domain runs without links_csv)
+    external_links: bool = True
+    # Called with the URL a page declares as <link rel=canonical>
+    on_canonical: Callable[[str], None] | None = None
+    # Called with the markdown of every page fetched (or reused) successfully
+    on_page: Callable[[str], None] | None = None
+    # Per-run SimHash index; near-duplicate pages return no links
+    near_duplicates: NearDuplicateIndex | None = None
+    skip_near_duplicates: bool = False
+
+
+async def _fetch_and_record(
+    crawler: Any,
+    out: AsyncRunWriter,
+    url: str,
+    formats: List[str],
+    depth: int | None = None,
+    opts: _FetchOptions | None = None,
+) -> PageLinks | None:
+    """Fetch one page, persist it and record it in the manifest.
+
+    Returns the page's links, or None if the fetch failed; a near-duplicate of an earlier
+    page returns no links, so its outlinks are not followed. Disk writes are queued on the
+    run's writer thread in call order; totals are counted on the loop right away so
+    page budgets see each page as soon as it finishes.
+    """
+    opts = opts or _FetchOptions()
+    revalidator = opts.revalidator
+    t0 = time.perf_counter()
+    depth_field: Dict[str, Any] = {"depth": depth} if depth is not None else {}
+    links: PageLinks | None = None
+    try:
+        await out.append_log({"event": "fetch_start", "url": url, **depth_field, "ts": time.time()})
+        cached = await revalidator.check(url) if revalidator is not None else None
+        declared: str | None = None
+        if cached is not None:
+            markdown, cached_links = cached
+            links = PageLinks.from_urls(url, cached_links)
+            via = "cache"
+            links_ms = 0.0
+        else:
+            result = await _fetch_page(crawler, url, opts.fetch_mode)
+            t_links = time.perf_counter()
+            links = extract_links(url, result, opts.link_source, key=opts.canonicalize, external=opts.external_links)
+            links_ms = (time.perf_counter() - t_links) * 1000
+            markdown = result.markdown or ""
+            via = "http" if isinstance(result, HttpFetchResult) else "browser"
+            if opts.on_canonical is not None:
+                declared = declared_canonical(getattr(result, "html", "") or "")
+                if declared:
+                    declared = urljoin(url, declared)
+                    opts.on_canonical(declared)
+
+        if opts.on_page is not None:
+            opts.on_page(markdown)
+        duplicate_of: str | None = None
+        if opts.near_duplicates is not None:
+            fingerprint = await asyncio.to_thread(simhash, markdown)
+            duplicate_of = opts.near_duplicates.check(url, fingerprint)
+
+        path: str | None = None
+        nbytes = 0
+        if duplicate_of is None or not opts.skip_near_duplicates:
+            path, nbytes = await out.write_page(url, markdown)
+            if revalidator is not None:
+                if cached is not None:
+                    revalidator.relocate(url, path)
+                else:
+                    headers = getattr(result, "response_headers", None)
+                    revalidator.remember(url, headers, content_digest(markdown)[0], path, links.all())
+            await out.append_jsonl({"url": url, "markdown_path": path, "bytes": nbytes})
+            if "links_csv" in formats and links:
+                await out.append_links_csv(url, links.all())
+
+        rec = PageRecord(
+            url=url,
+            status="ok",
+            path=path,
+            content_bytes=nbytes,
+            duration_ms=int((time.perf_counter() - t0) * 1000),
+            not_modified=cached is not None,
+            near_duplicate_of=duplicate_of,
+        )
+        await out.add_page(rec)
+        event = "fetch_not_modified" if cached is not None else "fetch_ok"
+        canonical_field: Dict[str, Any] = {"canonical": declared} if declared else {}
+        if duplicate_of is not None:
+            canonical_field["near_duplicate_of"] = duplicate_of
+        await out.append_log(
+            {
+                "event": event,
+                "url": url,
+                "bytes": nbytes,
+                "links": len(links),
+                "links_ms": round(links_ms, 2),
+                "via": via,
+                **canonical_field,
+                "ts": time.time(),
+            }
+        )
+        if duplicate_of is not None:
+            links = PageLinks()
+    except Exception as e:
+        rec = PageRecord(
+            url=url,
+            status="error",
+            path=None,
+            content_bytes=None,
+            error=str(e),
+            duration_ms=int((time.perf_counter() - t0) * 1000),
+        )
+        await out.add_page(rec)
+        await out.append_log({"event": "fetch_error", "url": url, "error": str(e), "ts": time.time()})
+        links = None
+    return links
+
+
+_SITEMAP_LOOKAHEAD = 64
+# Frontier URLs crawl_site sets aside while looking for one whose host is free
+_FRONTIER_LOOKAHEAD = 64
+# Sitemap URLs whose <priority> best_first crawl_site keeps
+_SITEMAP_PRIORITY_LIMIT = 50_000
+
+
+def _host_scheduler(politeness_delay_ms: int, max_concurrency: int, respect_robots: RobotsMode) -> HostScheduler:
+    return HostScheduler(
+        base_delay_s=politeness_delay_ms / 1000.0,
+        target_concurrency=max_concurrency,
+        crawl_delay_for=robots_cache.crawl_delay if respect_robots != "ignore" else None,
+    )
+
+
+async def _robots_allows(out: AsyncRunWriter, url: str, respect_robots: RobotsMode) -> bool:
+    """Apply the run's robots.txt mode to `url`; False means the URL must be skipped."""
+    if respect_robots == "ignore" or await robots_cache.allowed(url):
+        return True
+    if respect_robots == "warn":
+        logger.warning("robots.txt disallows url=%s (fetching anyway)", url)
+        await out.append_log({"event": "robots_disallowed", "url": url, "ts": time.time()})
+        return True
+    await out.append_log({"event": "robots_blocked", "url": url, "ts": time.time()})
+    return False
+
+
+async def _polite_fetch_and_record(
+    scheduler: HostScheduler,
+    crawler: Any,
+    out: AsyncRunWriter,
+    url: str,
+    formats: List[str],
+    depth: int | None = None,
+    opts: _FetchOptions | None = None,
+) -> PageLinks | None:
+    await scheduler.wait(url)
+    t0 = time.perf_counter()
+    try:
+        return await _fetch_and_record(crawler, out, url, formats, depth=depth, opts=opts)
+    finally:
+        scheduler.record(url, time.perf_counter() - t0)
+
+
 async def _persist_crawl_site(args: CrawlSiteArgs) -> CrawlPersistResult:
     require_public_http_url(str(args.entry_url))
-    run_id = generate_run_id("site")
+    run_id, run_dir, manifest, state = await _open_run(args, "site", "site", str(args.entry_url))
     logger.info("crawl_site start run_id=%s entry=%s depth=%d pages=%d", run_id, str(args.entry_url), args.max_depth, args.max_pages)
-    run_dir = ensure_run_dir(args.output_dir, run_id)
 
-    manifest = Manifest(
-        run_id=run_id,
-        entry=str(args.entry_url),
-        mode="site",
-        started_at=datetime.now(timezone.utc).isoformat(),
-        config=args.model_dump(),
-    )
-    write_manifest(run_dir, manifest)
+    out = await _open_run_writer(run_dir, args, manifest, resumed=state is not None)
+    await out.checkpoint()
 
-    include = _compile_patterns(args.include_patterns)
-    exclude = _compile_patterns(args.exclude_patterns)
     seed_host = urlparse(str(args.entry_url)).hostname or ""
+    # Compiled once; each page's links are filtered in one call
+    url_filter = UrlFilter(args.include_patterns, args.exclude_patterns, seed_host, args.same_domain_only)
+
+    canonical = UrlCanonicalizer(args.strip_params)
+    sitemap_priorities: Dict[str, float] = {}
+    frontier, scorer = _build_frontier(args, canonical, sitemap_priorities if args.sitemap_priority else None)
+    await out.append_frontier(_seed_frontier(frontier, str(args.entry_url), state))
+
+    # Popped URLs whose host was still in its politeness delay; they go first once it frees up
+    lookahead: List[tuple[str, int]] = []
+
+    async def take() -> tuple[str, int] | None:
+        i = next((i for i, (u, _) in enumerate(lookahead) if not scheduler.ready_in(u)), None)
+        while i is None and len(lookahead) < _FRONTIER_LOOKAHEAD:
+            job = frontier.pop()
+            if job is None:
+                break
+            lookahead.append(job)
+            if not scheduler.ready_in(job[0]):
+                i = len(lookahead) - 1
+        if i is None:
+            if not lookahead:
+                return None
+            i = scheduler.pick(u for u, _ in lookahead)
+        job = lookahead.pop(i)
+        scheduler.claim(job[0])
+        return job
+
+    stopper = AdaptiveStopper(args.query) if args.adaptive else None
+
+    def can_dispatch(in_flight: int) -> bool:
+        if stopper is not None and not stopper.should_continue():
+            return False
+        return manifest.totals.get("pages_ok", 0) + in_flight < args.max_pages
+
+    scheduler = _host_scheduler(args.politeness_delay_ms, args.max_concurrency, args.respect_robots)
+    revalidator = Revalidator(run_dir.parent) if args.revalidate else None
+    opts = _FetchOptions(
+        fetch_mode=args.fetch_mode,
+        revalidator=revalidator,
+        canonicalize=canonical,
+        link_source=args.link_source,
+        external_links=not args.same_domain_only or "links_csv" in args.formats,
+        on_page=stopper.add_page if stopper is not None else None,
+        on_canonical=frontier.mark_seen if args.honor_canonical else None,
+        near_duplicates=NearDuplicateIndex(args.near_duplicate_distance) if args.near_duplicates != "off" else None,
+        skip_near_duplicates=args.near_duplicates == "skip",
+    )
 
-    visited: Set[str] = set()
-    frontier: List[tuple[str, int]] = [(str(args.entry_url), 0)]
-
-    async with AsyncWebCrawler() as crawler:
-        while frontier and manifest.totals.get("pages_ok", 0) < args.max_pages:
-            url, depth = frontier.pop(0)
-            if url in visited:
-                continue
-            visited.add(url)
-
-            t0 = time.perf_counter()
-            try:
-                append_log_jsonl(run_dir, {"event": "fetch_start", "url": url, "depth": depth, "ts": time.time()})
-                with SuppressCrawl4AIOutput():
-                    result = await crawler.arun(url=url)
-                links: List[str] = _extract_links_from_result(url, result)
-
-                path, nbytes = persist_page_markdown(run_dir, url, result.markdown or "")
-                append_jsonl(run_dir, {"url": url, "markdown_path": path, "bytes": nbytes})
-                if "links_csv" in args.formats and links:
-                    append_links_csv(run_dir, url, links)
-
-                rec = PageRecord(
-                    url=url,
-                    status="ok",
-                    path=path,
-                    content_bytes=nbytes,
-                    duration_ms=int((time.perf_counter() - t0) * 1000),
-                )
-                manifest.pages.append(rec)
-                update_totals(manifest, rec)
-                append_log_jsonl(run_dir, {"event": "fetch_ok", "url": url, "bytes": nbytes, "links": len(links), "ts": time.time()})
-
-                if depth + 1 <= args.max_depth:
-                    for href in links:
-                        if manifest.totals.get("pages_ok", 0) >= args.max_pages:
-                            break
-                        if _url_allowed(href, seed_host, args.same_domain_only, include, exclude):
-                            if href not in visited and all(href != u for u, _ in frontier):
-                                frontier.append((href, depth + 1))
-
-            except Exception as e:
-                rec = PageRecord(
-                    url=url,
-                    status="error",
-                    path=None,
-                    content_bytes=None,
-                    error=str(e),
-                    duration_ms=int((time.perf_counter() - t0) * 1000),
-                )
-                manifest.pages.append(rec)
-                update_totals(manifest, rec)
-                append_log_jsonl(run_dir, {"event": "fetch_error", "url": url, "error": str(e), "ts": time.time()})
-
-            write_manifest(run_dir, manifest)
-            await asyncio.sleep(args.politeness_delay_ms / 1000.0)
+    # Sitemap priorities stream in while the crawl runs; URLs pushed before theirs arrive score as 0.5
+    priority_loader: asyncio.Future[None] | None = None
+    if scorer is not None and args.sitemap_priority:
+        priority_loader = asyncio.ensure_future(
+            _load_sitemap_priorities(str(args.entry_url), url_filter.allowed, canonical, sitemap_priorities)
+        )
 
-    manifest.finished_at = datetime.now(timezone.utc).isoformat()
-    manifest_path = write_manifest(run_dir, manifest)
+    try:
+        if revalidator is not None:
+            await revalidator.open()
+        async with crawler_pool.acquire_lazy() as crawler:
+
+            async def handle(job: tuple[str, int]) -> None:
+                url, depth = job
+                if not await _robots_allows(out, url, args.respect_robots):
+                    scheduler.release(url)
+                    return
+                links = await _polite_fetch_and_record(scheduler, crawler, out, url, args.formats, depth=depth, opts=opts)
+                if links and depth + 1 <= args.max_depth and manifest.totals.get("pages_ok", 0) < args.max_pages:
+                    candidates = links.internal if args.same_domain_only else links.all()
+                    await out.append_frontier(_push_links(frontier, scorer, links, url_filter.filter(candidates), depth + 1))
+
+            await run_bounded(take, handle, args.max_concurrency, can_dispatch)
+
+        await out.append_log(
+            {"event": "frontier_stats", **frontier.stats(), "pending": len(frontier) + len(lookahead), "ts": time.time()}
+        )
+        if opts.near_duplicates is not None:
+            await out.append_log({"event": "near_duplicate_stats", **opts.near_duplicates.stats(), "ts": time.time()})
+        if stopper is not None:
+            await out.append_log({"event": "adaptive_stats", **stopper.stats(), "ts": time.time()})
+        if revalidator is not None:
+            await out.append_log({"event": "revalidate_stats", "not_modified": revalidator.hits, "ts": time.time()})
+        await _log_store_stats(out)
+        manifest.finished_at = datetime.now(timezone.utc).isoformat()
+        manifest_path = await out.finalize()
+    finally:
+        if priority_loader is not None:
+            priority_loader.cancel()
+            await asyncio.gather(priority_loader, return_exceptions=True)
+        if revalidator is not None:
+            await revalidator.aclose()
+        await out.aclose()
 
     logger.info(
         "crawl_site done run_id=%s ok=%d failed=%d bytes=%d dir=%s",
@@ -588,72 +896,120 @@ async def _persist_crawl_site(args: CrawlSiteArgs) -> CrawlPersistResult:
 
 
 async def _persist_crawl_sitemap(args: CrawlSitemapArgs) -> CrawlPersistResult:
-    run_id = generate_run_id("sitemap")
+    run_id, run_dir, manifest, state = await _open_run(args, "sitemap", "sitemap", str(args.sitemap_url))
     logger.info("crawl_sitemap start run_id=%s sitemap=%s max_entries=%d", run_id, str(args.sitemap_url), args.max_entries)
-    run_dir = ensure_run_dir(args.output_dir, run_id)
 
-    manifest = Manifest(
-        run_id=run_id,
-        entry=str(args.sitemap_url),
-        mode="sitemap",
-        started_at=datetime.now(timezone.utc).isoformat(),
-        config=args.model_dump(),
+    out = await _open_run_writer(run_dir, args, manifest, resumed=state is not None)
+    await out.checkpoint()
+
+    baseline: Dict[str, str | None] = {}
+    if args.incremental:
+        baseline_run, baseline = await asyncio.to_thread(load_sitemap_baseline, run_dir.parent, str(args.sitemap_url))
+        await out.append_log(
+            {"event": "incremental_baseline", "run_id": baseline_run, "entries": len(baseline), "ts": time.time()}
+        )
+    unchanged = 0
+    # Unchanged entries dropped by the stream, waiting to be logged by take()
+    carried: List[Dict[str, Any]] = []
+
+    def skip_unchanged(entry: SitemapEntry) -> bool:
+        if baseline and not entry_changed(entry, baseline):
+            # Still part of this run's baseline for the next incremental run
+            carried.append(sitemap_record(entry, "unchanged"))
+            return True
+        return False
+
+    # Sitemap indexes are expanded in the background; page entries stream in as each child is parsed
+    canonical = UrlCanonicalizer(args.strip_params)
+    # Lazy parse -> filter -> dedupe -> skip unchanged -> limit: parsing stops once max_entries
+    # URLs that still need fetching are found. On resume, entries completed by the earlier
+    # attempt count as seen and the pages they produced count against max_entries.
+    sitemap = SitemapStream(
+        str(args.sitemap_url),
+        max_depth=args.sitemap_max_depth,
+        max_sitemaps=args.max_sitemaps,
+        accept=UrlFilter(args.include_patterns, args.exclude_patterns).allowed,
+        limit=max(1, args.max_entries - manifest.totals.get("pages_ok", 0)),
+        key=canonical,
+        skip=skip_unchanged if args.incremental else None,
+        seen=(canonical(u) for u in state.done) if state is not None else (),
     )
-    write_manifest(run_dir, manifest)
-
-    # Fetch and parse sitemap(s)
-    sitemap_text = await fetch_text(str(args.sitemap_url))
-    seeds: List[str] = []
-    if sitemap_text:
-        seeds = parse_sitemap_xml(sitemap_text)
-    seeds = seeds[: args.max_entries]
-    seeds = filter_urls(seeds, args.include_patterns, args.exclude_patterns)
-
-    async with AsyncWebCrawler() as crawler:
-        for url in seeds:
-            if manifest.totals.get("pages_ok", 0) >= args.max_entries:
+
+    scheduler = _host_scheduler(args.politeness_delay_ms, args.max_concurrency, args.respect_robots)
+    # Small lookahead so a slot goes to whichever host is free instead of queueing behind one host
+    lookahead: List[SitemapEntry] = []
+
+    async def next_seed() -> SitemapEntry | None:
+        # Only wait for sitemap downloads when there is nothing else to dispatch
+        if lookahead and not sitemap.ready():
+            return None
+        return await sitemap.next()
+
+    async def flush_carried() -> None:
+        nonlocal unchanged
+        if carried:
+            records = carried[:]
+            carried.clear()
+            unchanged += len(records)
+            await out.append_sitemap(records)
+
+    async def take() -> SitemapEntry | None:
+        while len(lookahead) < _SITEMAP_LOOKAHEAD:
+            nxt = await next_seed()
+            if nxt is None:
                 break
-            t0 = time.perf_counter()
-            try:
-                append_log_jsonl(run_dir, {"event": "fetch_start", "url": url, "ts": time.time()})
-                with SuppressCrawl4AIOutput():
-                    result = await crawler.arun(url=url)
-                links: List[str] = _extract_links_from_result(url, result)
-
-                path, nbytes = persist_page_markdown(run_dir, url, result.markdown or "")
-                append_jsonl(run_dir, {"url": url, "markdown_path": path, "bytes": nbytes})
-                if "links_csv" in args.formats and links:
-                    append_links_csv(run_dir, url, links)
-
-                rec = PageRecord(
-                    url=url,
-                    status="ok",
-                    path=path,
-                    content_bytes=nbytes,
-                    duration_ms=int((time.perf_counter() - t0) * 1000),
-                )
-                manifest.pages.append(rec)
-                update_totals(manifest, rec)
-                append_log_jsonl(run_dir, {"event": "fetch_ok", "url": url, "bytes": nbytes, "links": len(links), "ts": time.time()})
-
-            except Exception as e:
-                rec = PageRecord(
-                    url=url,
-                    status="error",
-                    path=None,
-                    content_bytes=None,
-                    error=str(e),
-                    duration_ms=int((time.perf_counter() - t0) * 1000),
-                )
-                manifest.pages.append(rec)
-                update_totals(manifest, rec)
-                append_log_jsonl(run_dir, {"event": "fetch_error", "url": url, "error": str(e), "ts": time.time()})
-
-            write_manifest(run_dir, manifest)
-            await asyncio.sleep(args.politeness_delay_ms / 1000.0)
+            lookahead.append(nxt)
+        await flush_carried()
+        if not lookahead:
+            return None
+        entry = lookahead.pop(scheduler.pick(e.loc for e in lookahead))
+        scheduler.claim(entry.loc)
+        return entry
+
+    def can_dispatch(in_flight: int) -> bool:
+        return manifest.totals.get("pages_ok", 0) + in_flight < args.max_entries
+
+    revalidator = Revalidator(run_dir.parent) if args.revalidate else None
+    opts = _FetchOptions(
+        fetch_mode=args.fetch_mode,
+        revalidator=revalidator,
+        canonicalize=canonical,
+        link_source=args.link_source,
+        # Sitemap runs follow no links; other-host links only matter for links.csv
+        external_links="links_csv" in args.formats,
+    )
 
-    manifest.finished_at = datetime.now(timezone.utc).isoformat()
-    manifest_path = write_manifest(run_dir, manifest)
+    try:
+        if revalidator is not None:
+            await revalidator.open()
+        sitemap.start()
+        async with crawler_pool.acquire_lazy() as crawler:
+
+            async def handle(entry: SitemapEntry) -> None:
+                if not await _robots_allows(out, entry.loc, args.respect_robots):
+                    scheduler.release(entry.loc)
+                    return
+                links = await _polite_fetch_and_record(scheduler, crawler, out, entry.loc, args.formats, opts=opts)
+                if links is not None:
+                    await out.append_sitemap([sitemap_record(entry, "ok")])
+
+            await run_bounded(take, handle, args.max_concurrency, can_dispatch)
+
+        if revalidator is not None:
+            await out.append_log({"event": "revalidate_stats", "not_modified": revalidator.hits, "ts": time.time()})
+        await _log_store_stats(out)
+        await out.append_log({"event": "sitemap_stats", **sitemap.stats(), "ts": time.time()})
+        await flush_carried()
+        if args.incremental:
+            await out.append_log({"event": "incremental_stats", "unchanged": unchanged, "ts": time.time()})
+        manifest.finished_at = datetime.now(timezone.utc).isoformat()
+        manifest_path = await out.finalize()
+        await asyncio.to_thread(record_successful_run, run_dir.parent, str(args.sitemap_url), run_id)
+    finally:
+        await sitemap.aclose()
+        if revalidator is not None:
+            await revalidator.aclose()
+        await out.aclose()
 
     logger.info(
         "crawl_sitemap done run_id=%s ok=%d failed=%d bytes=%d dir=%s",
@@ -690,6 +1046,8 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> Any:
         return json.loads(result.model_dump_json())
     elif name == "crawl":
         parsed = CrawlArgs.model_validate(arguments)
+        if parsed.resume_run_id and not parsed.output_dir:
+            raise ValueError("resume_run_id requires output_dir")
         if parsed.output_dir:
             result = await _persist_crawl(parsed)
             logger.info("crawl persist done start=%s pages_ok=%d", str(parsed.seed_url), result.pages_ok)
@@ -712,16 +1070,23 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> Any:
 
 async def _run_stdio_server() -> None:
     logger.info("server starting (stdio)")
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="crawl4ai-mcp",
-                server_version="0.1.0",
-                capabilities=server.get_capabilities(notification_options=NotificationOptions(), experimental_capabilities={}),
-            ),
-        )
+    with SuppressCrawl4AIOutput():
+        await crawler_pool.start()
+    await open_http_client()
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="crawl4ai-mcp",
+                    server_version="0.1.0",
+                    capabilities=server.get_capabilities(notification_options=NotificationOptions(), experimental_capabilities={}),
+                ),
+            )
+    finally:
+        await close_http_client()
+        await crawler_pool.close()
     logger.info("server stopped")
 
 
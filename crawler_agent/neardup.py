@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, List, Literal, Tuple
+
+
+NearDuplicateMode = Literal["off", "mark", "skip"]
+
+_FINGERPRINT_BITS = 64
+_SHINGLE_WORDS = 3
+# Below this many words a fingerprint says little; tiny pages are never called duplicates
+_MIN_WORDS = 20
+
+_WORD_RE = re.compile(r"\w+")
+# Link targets repeat on every page of a site (navigation); only the link text counts
+_MD_LINK_TARGET_RE = re.compile(r"\]\([^)]*\)")
+
+
+def simhash(text: str) -> int | None:
+    """64-bit SimHash of `text` over word 3-shingles, or None if the text is too short.
+
+    Markdown link targets are dropped first, so shared navigation does not pull unrelated
+    pages together.
+    """
+    words = _WORD_RE.findall(_MD_LINK_TARGET_RE.sub("]", text).lower())
+    if len(words) < _MIN_WORDS:
+        return None
+    shingles = Counter(" ".join(words[i : i + _SHINGLE_WORDS]) for i in range(len(words) - _SHINGLE_WORDS + 1))
+    weights = [0] * _FINGERPRINT_BITS
+    for shingle, count in shingles.items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(_FINGERPRINT_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+    fp = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fp |= 1 << bit
+    return fp
+
+
+class NearDuplicateIndex:
+    """Per-run index of page SimHashes, answering "is this page a near-duplicate?".
+
+    Two pages are near-duplicates when their fingerprints differ in at most `max_distance`
+    bits. Fingerprints are split into `max_distance + 1` bands and bucketed by each band
+    (LSH): two fingerprints within the distance must agree exactly on at least one band,
+    so a lookup only compares against the pages sharing a bucket instead of every page
+    seen so far.
+    """
+
+    def __init__(self, max_distance: int = 6) -> None:
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width, extra = divmod(_FINGERPRINT_BITS, bands)
+        self._bands: List[Tuple[int, int]] = []
+        shift = 0
+        for i in range(bands):
+            bits = width + (1 if i < extra else 0)
+            self._bands.append((shift, (1 << bits) - 1))
+            shift += bits
+        self._buckets: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in self._bands]
+        self.indexed = 0
+        self.duplicates = 0
+
+    def find(self, fp: int) -> str | None:
+        """URL of an indexed page within `max_distance` bits of `fp`, if any."""
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            for other, url in buckets.get(fp >> shift & mask, ()):
+                if bin(fp ^ other).count("1") <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, fp: int, url: str) -> None:
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            buckets.setdefault(fp >> shift & mask, []).append((fp, url))
+        self.indexed += 1
+
+    def check(self, url: str, fp: int | None) -> str | None:
+        """Return the page `url` duplicates, or index it as a new original and return None."""
+        if fp is None:
+            return None
+        original = self.find(fp)
+        if original is not None:
+            self.duplicates += 1
+            return original
+        self.add(fp, url)
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {"indexed": self.indexed, "near_duplicates": self.duplicates, "max_distance": self.max_distance}
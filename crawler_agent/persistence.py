@@ -1,16 +1,28 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import csv
 import hashlib
 import json
+import os
 import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Callable, Dict, Iterator, Literal, TextIO, Tuple
 
 from pydantic import BaseModel
 
+try:  # POSIX only; elsewhere shared files are only locked within one process
+    import fcntl
+except ImportError:  # pragma: no cover - optional
+    fcntl = None  # type: ignore[assignment]
+
 
 def generate_run_id(prefix: str | None = None) -> str:
     now = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
@@ -33,7 +45,7 @@ def _slugify(text: str) -> str:
     return text[:180] if text else "index"
 
 
-def _build_page_filename(url: str, markdown: str, pages_dir: Path) -> str:
+def _page_name_base(url: str) -> str:
     # docs/openai-agents-like: hostname + path with '/' -> '_', no hashes
     try:
         from urllib.parse import urlparse
@@ -50,7 +62,11 @@ def _build_page_filename(url: str, markdown: str, pages_dir: Path) -> str:
             name_base += "_"
     except Exception:
         name_base = "page"
-    name_base = _slugify(name_base)
+    return _slugify(name_base)
+
+
+def _build_page_filename(url: str, markdown: str, pages_dir: Path) -> str:
+    name_base = _page_name_base(url)
     fname = f"{name_base}.md"
     candidate = pages_dir / fname
     if not candidate.exists():
@@ -65,6 +81,46 @@ def _build_page_filename(url: str, markdown: str, pages_dir: Path) -> str:
         counter += 1
 
 
+PagesLayout = Literal["flat", "sharded"]
+
+
+class PageNameRegistry:
+    """Per-run allocator of unique page file names that never touches the disk.
+
+    Names follow the same `<host>_<path>[-N].md` scheme as `_build_page_filename`; the
+    next free suffix is remembered per base name, so allocation is O(1) amortized no
+    matter how many URLs slugify alike. With `sharded=True` files go to
+    `pages/ab/cd/<name>.md` (first hex digits of the name's sha1) so no single directory
+    grows to tens of thousands of entries.
+    """
+
+    def __init__(self, pages_dir: Path, sharded: bool = False) -> None:
+        self.pages_dir = pages_dir
+        self.sharded = sharded
+        self._next_suffix: Dict[str, int] = {}
+        self._taken: set[str] = set()
+
+    def scan(self) -> None:
+        """Mark names already on disk as taken (used when resuming a run)."""
+        if self.pages_dir.exists():
+            self._taken.update(p.stem for p in self.pages_dir.rglob("*.md"))
+
+    def allocate(self, url: str) -> Path:
+        base = _page_name_base(url)
+        n = self._next_suffix.get(base, 0)
+        while True:
+            name = base if n == 0 else f"{base}-{n}"
+            n += 1
+            if name not in self._taken:
+                break
+        self._next_suffix[base] = n
+        self._taken.add(name)
+        if not self.sharded:
+            return self.pages_dir / f"{name}.md"
+        h = hashlib.sha1(name.encode()).hexdigest()
+        return self.pages_dir / h[:2] / h[2:4] / f"{name}.md"
+
+
 def persist_page_markdown(run_dir: Path, url: str, markdown: str) -> Tuple[str, int]:
     pages_dir = run_dir / "pages"
     pages_dir.mkdir(parents=True, exist_ok=True)
@@ -75,10 +131,76 @@ def persist_page_markdown(run_dir: Path, url: str, markdown: str) -> Tuple[str,
     return str(p), len(data)
 
 
-def append_jsonl(run_dir: Path, record: Dict[str, Any]) -> None:
-    out = run_dir / "pages.jsonl"
-    with out.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+STORE_DIR = "_store"
+CACHE_DIR = "_cache"
+FRONTIER_LOG = "frontier.ndjson"
+SITEMAP_LOG = "sitemap.ndjson"
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write `data` to a uniquely named temp file next to `path`, then rename it over `path`."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+def content_digest(markdown: str) -> Tuple[str, bytes]:
+    data = (markdown or "").encode("utf-8")
+    return hashlib.sha256(data).hexdigest(), data
+
+
+class ContentStore:
+    """Content-addressed markdown blobs shared by every run under one output_dir.
+
+    A page is stored once as `<output_dir>/_store/objects/ab/<sha256>.md`, however many
+    runs fetch it. `index.txt` lists the digests already stored, so a repeat crawl skips
+    rewriting unchanged pages without touching the blob files. Blobs are written with an
+    atomic rename, so concurrent runs sharing the store never see partial files.
+    """
+
+    def __init__(self, base_output_dir: Path) -> None:
+        self.root = base_output_dir / STORE_DIR
+        self._index_path = self.root / "index.txt"
+        self._known: set[str] | None = None
+        self.stored = 0
+        self.reused = 0
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.md"
+
+    def _load_index(self) -> set[str]:
+        if self._known is None:
+            self._known = set()
+            if self._index_path.exists():
+                with self._index_path.open(encoding="utf-8") as f:
+                    self._known.update(line.strip() for line in f if line.strip())
+        return self._known
+
+    def put(self, digest: str, data: bytes) -> bool:
+        """Store `data` under `digest`; returns False when it was already stored."""
+        known = self._load_index()
+        if digest in known:
+            self.reused += 1
+            return False
+        p = self.path_for(digest)
+        # Another run may store the same digest at the same time; same name, same bytes
+        if not p.exists():
+            p.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write_bytes(p, data)
+        with self._index_path.open("a", encoding="utf-8") as f:
+            f.write(digest + "\n")
+        known.add(digest)
+        self.stored += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {"stored": self.stored, "reused": self.reused}
 
 
 def append_links_csv(run_dir: Path, url: str, links: list[str]) -> None:
@@ -92,10 +214,106 @@ def append_links_csv(run_dir: Path, url: str, links: list[str]) -> None:
             w.writerow([url, link])
 
 
-def append_log_jsonl(run_dir: Path, event: Dict[str, Any]) -> None:
-    log_path = run_dir / "log.ndjson"
-    with log_path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+class RunWriter:
+    """Keeps a run's append-only streams (pages.jsonl, links.csv, log.ndjson, ...) open.
+
+    Writes are buffered and flushed once `flush_bytes` have accumulated or
+    `flush_interval_s` has passed since the last flush; `flush(fsync=True)` makes
+    everything written so far durable (used at manifest checkpoints). Use as a context
+    manager so the streams are closed when the run ends, even on error. Page files are
+    written by `write_file`; AsyncRunWriter.write_page names them with the run's
+    PageNameRegistry (`names`), or stores them in the shared ContentStore (`store`) when
+    one is given.
+    """
+
+    def __init__(
+        self,
+        run_dir: Path,
+        flush_bytes: int = 256 * 1024,
+        flush_interval_s: float = 2.0,
+        pages_layout: PagesLayout = "flat",
+        store: ContentStore | None = None,
+    ) -> None:
+        self.run_dir = run_dir
+        self.names = PageNameRegistry(run_dir / "pages", sharded=pages_layout == "sharded")
+        self.store = store
+        self.flush_bytes = flush_bytes
+        self.flush_interval_s = flush_interval_s
+        self._files: Dict[str, TextIO] = {}
+        self._made_dirs: set[Path] = {run_dir / "pages"}
+        self._links_writer: Any = None
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self) -> "RunWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _open(self, name: str, newline: str | None = None) -> TextIO:
+        f = self._files.get(name)
+        if f is None:
+            f = (self.run_dir / name).open("a", encoding="utf-8", newline=newline)
+            self._files[name] = f
+        return f
+
+    def _wrote(self, nbytes: int) -> None:
+        self._unflushed += nbytes
+        if self._unflushed >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def write_file(self, path: Path, data: bytes) -> None:
+        if path.parent not in self._made_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._made_dirs.add(path.parent)
+        path.write_bytes(data)
+
+    def append_line(self, name: str, line: str) -> None:
+        self._open(name).write(line + "\n")
+        self._wrote(len(line) + 1)
+
+    def append_jsonl(self, record: Dict[str, Any]) -> None:
+        self.append_line("pages.jsonl", json.dumps(record, ensure_ascii=False))
+
+    def append_log(self, event: Dict[str, Any]) -> None:
+        self.append_line("log.ndjson", json.dumps(event, ensure_ascii=False))
+
+    def append_frontier(self, entries: list[Tuple[str, int]]) -> None:
+        for url, depth in entries:
+            self.append_line(FRONTIER_LOG, json.dumps([url, depth], ensure_ascii=False))
+
+    def append_sitemap(self, records: list[Dict[str, Any]]) -> None:
+        for rec in records:
+            self.append_line(SITEMAP_LOG, json.dumps(rec, ensure_ascii=False))
+
+    def append_links_csv(self, url: str, links: list[str]) -> None:
+        if self._links_writer is None:
+            header_needed = not (self.run_dir / "links.csv").exists()
+            self._links_writer = csv.writer(self._open("links.csv", newline=""))
+            if header_needed:
+                self._links_writer.writerow(["page_url", "link"])
+        self._links_writer.writerows([url, link] for link in links)
+        self._wrote(sum(len(url) + len(link) + 3 for link in links))
+
+    def flush(self, fsync: bool = False) -> None:
+        for f in self._files.values():
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close_stream(self, name: str) -> None:
+        f = self._files.pop(name, None)
+        if f is not None:
+            f.close()
+            if name == "links.csv":
+                self._links_writer = None
+
+    def close(self) -> None:
+        for name in list(self._files):
+            self.close_stream(name)
 
 
 class PageRecord(BaseModel):
@@ -105,6 +323,8 @@ class PageRecord(BaseModel):
     content_bytes: int | None
     error: str | None = None
     duration_ms: int = 0
+    not_modified: bool = False  # markdown reused from an earlier run after a 304
+    near_duplicate_of: str | None = None  # earlier page of the run with nearly the same content
 
 
 class Manifest(BaseModel):
@@ -119,15 +339,60 @@ class Manifest(BaseModel):
     config: Dict[str, Any] = {}
 
 
-def write_manifest(run_dir: Path, manifest: Manifest) -> str:
+MANIFEST_PAGES_LOG = "manifest.pages.ndjson"
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    _atomic_write_bytes(path, text.encode("utf-8"))
+
+
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Serialize read-merge-write cycles on a file shared by runs in one output_dir.
+
+    Runs in this process take a per-path lock; where `flock` exists a `<name>.lock` file
+    also keeps other server processes out.
+    """
+    with _file_locks_guard:
+        lock = _file_locks.setdefault(str(path), threading.Lock())
+    with lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path.with_name(path.name + ".lock"), "a") as lf:
+            if fcntl is not None:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lf, fcntl.LOCK_UN)
+
+
+def write_manifest(run_dir: Path, manifest: Manifest, extra: Dict[str, Any] | None = None) -> str:
     manifest_path = run_dir / "manifest.json"
-    payload = json.loads(manifest.model_dump_json())
-    manifest_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    if extra:
+        payload = {**manifest.model_dump(mode="json"), **extra}
+        text = json.dumps(payload, ensure_ascii=False, indent=2)
+    else:
+        text = manifest.model_dump_json(indent=2)
+    _atomic_write_text(manifest_path, text)
     return str(manifest_path)
 
 
-def load_manifest(path: str) -> Manifest:
+def load_manifest(path: str | Path, with_log: bool = True) -> Manifest:
+    """Load a manifest.json; with `with_log=False` the pages of an unfinished run's append
+    log are left out and only the records stored inline are loaded."""
     data = json.loads(Path(path).read_text(encoding="utf-8"))
+    pages_log = data.pop("pages_log", None)
+    if pages_log and with_log:
+        # Checkpoint of an unfinished incremental run: page records live in the append log
+        log_path = Path(path).parent / pages_log
+        if log_path.exists():
+            with log_path.open(encoding="utf-8") as f:
+                data["pages"] = data.get("pages", []) + [json.loads(line) for line in f if line.strip()]
     if "pages" in data:
         data["pages"] = [PageRecord(**p) for p in data["pages"]]
     return Manifest(**data)
@@ -139,3 +404,156 @@ def update_totals(manifest: Manifest, rec: PageRecord) -> None:
         manifest.totals["bytes_written"] = manifest.totals.get("bytes_written", 0) + int(rec.content_bytes or 0)
     else:
         manifest.totals["pages_failed"] = manifest.totals.get("pages_failed", 0) + 1
+
+
+class ManifestWriter:
+    """Incremental manifest for long runs.
+
+    Page records are appended to `manifest.pages.ndjson` through the run's RunWriter
+    instead of being kept on the manifest and re-serialized after every page.
+    `manifest.json` holds the header and totals, rewritten atomically every
+    `checkpoint_every` pages or `checkpoint_interval_s` seconds after the run's streams
+    are fsynced, and is compacted into the full manifest (with all pages) once by `finalize`.
+    """
+
+    def __init__(
+        self,
+        out: RunWriter,
+        manifest: Manifest,
+        checkpoint_every: int = 50,
+        checkpoint_interval_s: float = 5.0,
+    ) -> None:
+        self.out = out
+        self.run_dir = out.run_dir
+        self.manifest = manifest
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.checkpoint_interval_s = checkpoint_interval_s
+        self._log_path = self.run_dir / MANIFEST_PAGES_LOG
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    def count(self, rec: PageRecord) -> None:
+        """Update totals only; no I/O, so it is safe to call on the event loop."""
+        update_totals(self.manifest, rec)
+
+    def write_record(self, rec: PageRecord) -> None:
+        self.out.append_line(MANIFEST_PAGES_LOG, rec.model_dump_json())
+        self._since_checkpoint += 1
+        if (
+            self._since_checkpoint >= self.checkpoint_every
+            or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval_s
+        ):
+            self.checkpoint()
+
+    def checkpoint(self) -> str:
+        self.out.flush(fsync=True)
+        path = write_manifest(self.run_dir, self.manifest, extra={"pages_log": MANIFEST_PAGES_LOG})
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        return path
+
+    def finalize(self) -> str:
+        """Compact header, totals and all logged page records into the final manifest.json."""
+        self.out.close_stream(MANIFEST_PAGES_LOG)
+        self.out.flush()
+        pages: list[PageRecord] = list(self.manifest.pages)
+        if self._log_path.exists():
+            with self._log_path.open(encoding="utf-8") as f:
+                pages.extend(PageRecord.model_validate_json(line) for line in f if line.strip())
+        self.manifest.pages = pages
+        path = write_manifest(self.run_dir, self.manifest)
+        self._log_path.unlink(missing_ok=True)
+        return path
+
+
+class AsyncRunWriter:
+    """Async front end that runs all of a run's disk I/O on one dedicated writer thread.
+
+    Calls are queued in order on a single-thread executor, so RunWriter and
+    ManifestWriter are only ever touched from that thread. At most `max_pending` writes
+    may be queued; beyond that callers wait (backpressure) instead of buffering without
+    bound. Page names are allocated and totals counted on the event loop, so callers get
+    paths and up-to-date totals immediately without waiting for the disk. The first
+    failed background write is re-raised on the next call.
+    """
+
+    def __init__(self, out: RunWriter, manifest: Manifest | None = None, max_pending: int = 256) -> None:
+        self.out = out
+        self.run_dir = out.run_dir
+        self.manifest_writer = ManifestWriter(out, manifest) if manifest is not None else None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="run-writer")
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pending: set[asyncio.Future[Any]] = set()
+        self._error: BaseException | None = None
+
+    def _done(self, fut: asyncio.Future[Any]) -> None:
+        self._pending.discard(fut)
+        self._slots.release()
+        if not fut.cancelled() and fut.exception() is not None and self._error is None:
+            self._error = fut.exception()
+
+    async def submit(self, fn: Callable[..., Any], *args: Any) -> asyncio.Future[Any]:
+        """Queue `fn(*args)` on the writer thread; waits only while the queue is full."""
+        if self._error is not None:
+            raise self._error
+        await self._slots.acquire()
+        fut = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        self._pending.add(fut)
+        fut.add_done_callback(self._done)
+        return fut
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` on the writer thread after everything queued before it."""
+        return await (await self.submit(fn, *args))
+
+    async def write_page(self, url: str, markdown: str) -> Tuple[str, int]:
+        store = self.out.store
+        if store is not None:
+            digest, data = content_digest(markdown)
+            await self.submit(store.put, digest, data)
+            return str(store.path_for(digest)), len(data)
+        p = self.out.names.allocate(url)
+        data = (markdown or "").encode("utf-8")
+        await self.submit(self.out.write_file, p, data)
+        return str(p), len(data)
+
+    async def append_jsonl(self, record: Dict[str, Any]) -> None:
+        await self.submit(self.out.append_jsonl, record)
+
+    async def append_log(self, event: Dict[str, Any]) -> None:
+        await self.submit(self.out.append_log, event)
+
+    async def append_links_csv(self, url: str, links: list[str]) -> None:
+        await self.submit(self.out.append_links_csv, url, list(links))
+
+    async def append_frontier(self, entries: list[Tuple[str, int]]) -> None:
+        if entries:
+            await self.submit(self.out.append_frontier, list(entries))
+
+    async def append_sitemap(self, records: list[Dict[str, Any]]) -> None:
+        if records:
+            await self.submit(self.out.append_sitemap, list(records))
+
+    async def add_page(self, rec: PageRecord) -> None:
+        assert self.manifest_writer is not None
+        self.manifest_writer.count(rec)
+        await self.submit(self.manifest_writer.write_record, rec)
+
+    async def checkpoint(self) -> str:
+        assert self.manifest_writer is not None
+        return await self.call(self.manifest_writer.checkpoint)
+
+    async def finalize(self) -> str:
+        assert self.manifest_writer is not None
+        return await self.call(self.manifest_writer.finalize)
+
+    async def aclose(self) -> None:
+        """Drain queued writes, close the streams and stop the writer thread."""
+        try:
+            if self._pending:
+                await asyncio.gather(*self._pending, return_exceptions=True)
+            await asyncio.get_running_loop().run_in_executor(self._executor, self.out.close)
+        finally:
+            self._executor.shutdown(wait=False)
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+
+async def run_bounded(
+    take: Callable[[], Awaitable[Optional[T]]],
+    handle: Callable[[T], Awaitable[None]],
+    max_concurrency: int,
+    can_dispatch: Callable[[int], bool] = lambda in_flight: True,
+) -> None:
+    """Run `handle` over jobs pulled from `take` with at most `max_concurrency` in flight.
+
+    `take` returns None when no job is available right now; the dispatcher then waits for
+    an in-flight job to finish (it may have produced new work, e.g. frontier links) and asks
+    again. The run ends once nothing is in flight and `take` has nothing left.
+    `can_dispatch(in_flight)` lets callers hold back new jobs, e.g. to stay within a page
+    budget without overshooting it while earlier fetches are still running.
+    """
+    limit = max(1, max_concurrency)
+    in_flight: Set[asyncio.Task[None]] = set()
+    try:
+        while True:
+            while len(in_flight) < limit and can_dispatch(len(in_flight)):
+                job = await take()
+                if job is None:
+                    break
+                in_flight.add(asyncio.create_task(handle(job)))
+            if not in_flight:
+                return
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
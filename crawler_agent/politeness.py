@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+
+logger = logging.getLogger("crawl4ai_mcp")
+
+CrawlDelayLookup = Callable[[str], Awaitable[Optional[float]]]
+
+
+def host_key(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+class HostScheduler:
+    """Per-host politeness: each host has its own next-allowed-fetch time.
+
+    Fetches to different hosts never wait on each other; fetches to the same host are
+    spaced by that host's delay, which is the largest of the configured base delay, the
+    robots.txt `Crawl-delay` (looked up once per host via `crawl_delay_for`) and an
+    adaptive term derived from the host's recent response times. The adaptive term is
+    `latency / target_concurrency`, so a host that slows down gets fewer requests per
+    second. Both the adaptive term and the `Crawl-delay` are capped at `max_delay_s`, so
+    a site asking for hours between requests cannot stall a run.
+    """
+
+    def __init__(
+        self,
+        base_delay_s: float,
+        target_concurrency: int = 1,
+        max_delay_s: float = 30.0,
+        crawl_delay_for: CrawlDelayLookup | None = None,
+        ewma_alpha: float = 0.3,
+    ) -> None:
+        self.base_delay_s = max(0.0, base_delay_s)
+        self.target_concurrency = max(1, target_concurrency)
+        self.max_delay_s = max_delay_s
+        self._crawl_delay_for = crawl_delay_for
+        self._alpha = ewma_alpha
+        self._next_at: Dict[str, float] = {}
+        self._latency: Dict[str, float] = {}
+        self._crawl_delay: Dict[str, Optional[float]] = {}
+        self._lookups: Dict[str, asyncio.Task[Optional[float]]] = {}
+        # URLs handed to a worker whose fetch slot is not reserved yet, per host
+        self._claimed: Counter[str] = Counter()
+
+    def _clamp_crawl_delay(self, host: str, seconds: float | None) -> float | None:
+        if seconds is not None and seconds > self.max_delay_s:
+            logger.warning(
+                "robots.txt Crawl-delay of %ss for %s exceeds the %ss limit; using the limit",
+                seconds,
+                host,
+                self.max_delay_s,
+            )
+            return self.max_delay_s
+        return seconds
+
+    def delay_for(self, host: str) -> float:
+        adaptive = min(self.max_delay_s, self._latency.get(host, 0.0) / self.target_concurrency)
+        return max(self.base_delay_s, self._crawl_delay.get(host) or 0.0, adaptive)
+
+    def ready_in(self, url: str) -> float:
+        """Seconds until `url`'s host may be fetched again (0 if it may be fetched now).
+
+        Claimed URLs of the host that have not reserved their slot yet count as queued ahead.
+        """
+        host = host_key(url)
+        wait = max(0.0, self._next_at.get(host, 0.0) - time.monotonic())
+        return wait + self._claimed[host] * self.delay_for(host)
+
+    def claim(self, url: str) -> None:
+        """Note that `url` was handed to a worker, so `pick` treats its host as busy
+        before the worker gets to `wait`."""
+        self._claimed[host_key(url)] += 1
+
+    def release(self, url: str) -> None:
+        """Drop a claim for `url` that will not reach `wait` (e.g. robots.txt disallowed it)."""
+        host = host_key(url)
+        if self._claimed[host] > 0:
+            self._claimed[host] -= 1
+
+    def pick(self, urls: Iterable[str]) -> int:
+        """Index of the URL whose host frees up soonest; ties keep the original order."""
+        best, best_wait = 0, float("inf")
+        # One reading per host, so the clock moving on does not break ties between its URLs
+        waits: Dict[str, float] = {}
+        for i, u in enumerate(urls):
+            host = host_key(u)
+            wait = waits.get(host)
+            if wait is None:
+                wait = waits[host] = self.ready_in(u)
+            if wait < best_wait:
+                best, best_wait = i, wait
+                if wait == 0.0:
+                    break
+        return best
+
+    async def _ensure_crawl_delay(self, url: str, host: str) -> None:
+        if self._crawl_delay_for is None or host in self._crawl_delay:
+            return
+        task = self._lookups.get(host)
+        if task is None:
+            p = urlparse(url)
+            task = asyncio.ensure_future(self._crawl_delay_for(f"{p.scheme}://{p.netloc}"))
+            self._lookups[host] = task
+        try:
+            delay = await asyncio.shield(task)
+        except Exception:
+            delay = None
+        if host not in self._crawl_delay:
+            self._crawl_delay[host] = self._clamp_crawl_delay(host, delay)
+
+    async def wait(self, url: str) -> None:
+        """Reserve the next fetch slot for `url`'s host and sleep until it arrives."""
+        host = host_key(url)
+        await self._ensure_crawl_delay(url, host)
+        self.release(url)
+        now = time.monotonic()
+        slot = max(now, self._next_at.get(host, 0.0))
+        self._next_at[host] = slot + self.delay_for(host)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def record(self, url: str, response_time_s: float) -> None:
+        """Feed a measured response time into the host's latency average."""
+        host = host_key(url)
+        prev = self._latency.get(host)
+        self._latency[host] = response_time_s if prev is None else prev + self._alpha * (response_time_s - prev)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from .persistence import FRONTIER_LOG, MANIFEST_PAGES_LOG, Manifest, PageRecord, load_manifest, update_totals
+
+
+_RUN_ID_RE = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+@dataclass
+class RunState:
+    """What a resumed run needs: its manifest, the URLs already handled and the pending frontier."""
+
+    manifest: Manifest
+    done: Set[str] = field(default_factory=set)
+    pending: List[Tuple[str, int]] = field(default_factory=list)
+
+
+def resolve_run_dir(base_output_dir: str, run_id: str) -> Path:
+    if not _RUN_ID_RE.match(run_id):
+        raise ValueError(f"Invalid run id: {run_id!r}")
+    run_dir = Path(base_output_dir).expanduser().resolve() / run_id
+    if not (run_dir / "manifest.json").exists():
+        raise ValueError(f"Cannot resume run {run_id!r}: no manifest.json in {run_dir}")
+    return run_dir
+
+
+def _read_ndjson(path: Path) -> Iterator[Any]:
+    if not path.exists():
+        return
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from a run that was killed mid-write
+                continue
+
+
+def load_run_state(run_dir: Path) -> RunState:
+    """Rebuild a run's state from the files an interrupted attempt left behind.
+
+    Page records come from manifest.json plus its append log; completed URLs also from
+    log.ndjson and pages.jsonl; pending URLs are the frontier push log minus everything
+    completed. Totals are recomputed from the page records, since the manifest checkpoint
+    may be older than the last page written.
+    """
+    # Records already in the append log stay there; only inline ones are kept in memory
+    manifest = load_manifest(run_dir / "manifest.json", with_log=False)
+    manifest.totals = {"pages_ok": 0, "pages_failed": 0, "bytes_written": 0}
+    manifest.finished_at = None
+    inline = list(manifest.pages)
+    logged = [PageRecord(**p) for p in _read_ndjson(run_dir / MANIFEST_PAGES_LOG)]
+
+    done: Set[str] = set()
+    for rec in inline + logged:
+        update_totals(manifest, rec)
+        done.add(rec.url)
+
+    # crawl (persisted) keeps its page records only in pages.jsonl
+    count_jsonl = not inline and not logged
+    for rec in _read_ndjson(run_dir / "pages.jsonl"):
+        url = rec.get("url")
+        if not isinstance(url, str):
+            continue
+        done.add(url)
+        if count_jsonl and "status" in rec:
+            update_totals(manifest, PageRecord(**rec))
+
+    for event in _read_ndjson(run_dir / "log.ndjson"):
+        if event.get("event") in ("fetch_ok", "fetch_not_modified", "fetch_error") and isinstance(event.get("url"), str):
+            done.add(event["url"])
+
+    pending: List[Tuple[str, int]] = []
+    queued: Dict[str, int] = {}
+    for entry in _read_ndjson(run_dir / FRONTIER_LOG):
+        url, depth = entry
+        if url not in done and url not in queued:
+            queued[url] = depth
+            pending.append((url, depth))
+
+    return RunState(manifest=manifest, done=done, pending=pending)
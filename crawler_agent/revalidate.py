@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Tuple
+
+import httpx
+
+from .http_client import shared_http_client
+from .persistence import CACHE_DIR, _atomic_write_text, file_lock
+from .urlnorm import canonicalize_url
+
+
+VALIDATORS_FILE = "validators.ndjson"
+
+
+def cache_key(url: str) -> str:
+    return canonicalize_url(url)
+
+
+def _header(headers: Mapping[str, Any], name: str) -> str | None:
+    for k, v in headers.items():
+        if k.lower() == name:
+            return str(v)
+    return None
+
+
+class Revalidator:
+    """Conditional re-fetch cache shared by runs in the same output_dir.
+
+    For every page fetched it remembers the ETag / Last-Modified the server sent, the
+    markdown's content hash, where the markdown was stored and the page's links. On a
+    later run `check` sends a cheap conditional GET (headers only, body never read); a
+    304 means the stored markdown and links can be reused without a browser render.
+    The cache lives in `<output_dir>/_cache/validators.ndjson`. When the run closes,
+    the entries it changed are merged into the file as it is on disk then (other runs in
+    the same output_dir may have saved meanwhile) and the result is written atomically.
+    """
+
+    def __init__(self, base_output_dir: Path, client: httpx.AsyncClient | None = None) -> None:
+        self.path = base_output_dir / CACHE_DIR / VALIDATORS_FILE
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Entries this run added, updated (entry) or dropped (None), by key
+        self._changed: Dict[str, Dict[str, Any] | None] = {}
+        self._client = client
+        self.hits = 0
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        entries: Dict[str, Dict[str, Any]] = {}
+        if not self.path.exists():
+            return entries
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(entry, dict) and isinstance(entry.get("url"), str):
+                    entries[entry["url"]] = entry
+        return entries
+
+    def _load(self) -> None:
+        self._entries = self._read()
+
+    def _save(self) -> None:
+        with file_lock(self.path):
+            entries = self._read()
+            for key, entry in self._changed.items():
+                if entry is None:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = entry
+            _atomic_write_text(self.path, "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries.values()))
+        self._changed.clear()
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self._load)
+        if self._client is None:
+            self._client = shared_http_client()
+
+    async def aclose(self) -> None:
+        if self._changed:
+            await asyncio.to_thread(self._save)
+
+    async def check(self, url: str) -> Tuple[str, List[str]] | None:
+        """Return (markdown, links) from the earlier fetch if the server says 304 Not Modified."""
+        entry = self._entries.get(cache_key(url))
+        if entry is None or self._client is None:
+            return None
+        headers: Dict[str, str] = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        if not headers or not entry.get("path"):
+            return None
+        try:
+            async with self._client.stream("GET", url, headers=headers) as r:
+                if r.status_code != 304:
+                    return None
+        except httpx.HTTPError:
+            return None
+        try:
+            markdown = await asyncio.to_thread(Path(entry["path"]).read_text, encoding="utf-8")
+        except OSError:
+            return None
+        self.hits += 1
+        return markdown, list(entry.get("links") or [])
+
+    def relocate(self, url: str, path: str) -> None:
+        """Point a reused entry at the copy written by the current run."""
+        entry = self._entries.get(cache_key(url))
+        if entry is not None and entry.get("path") != path:
+            entry["path"] = path
+            self._changed[entry["url"]] = entry
+
+    def remember(
+        self,
+        url: str,
+        response_headers: Mapping[str, Any] | None,
+        content_hash: str,
+        path: str,
+        links: List[str],
+    ) -> None:
+        headers = response_headers or {}
+        etag = _header(headers, "etag")
+        last_modified = _header(headers, "last-modified")
+        key = cache_key(url)
+        if not etag and not last_modified:
+            if self._entries.pop(key, None) is not None:
+                self._changed[key] = None
+            return
+        self._entries[key] = self._changed[key] = {
+            "url": key,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": content_hash,
+            "path": path,
+            "links": links,
+        }
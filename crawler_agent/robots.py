@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Literal, Pattern, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from .http_client import shared_http_client
+
+
+RobotsMode = Literal["enforce", "warn", "ignore"]
+
+# Google and RFC 9309 only read the first 500 KiB of a robots.txt
+_MAX_ROBOTS_BYTES = 500 * 1024
+_MAX_CACHED_HOSTS = 10_000
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class RobotsRules:
+    """Compiled Allow/Disallow rules of the robots.txt group that applies to us.
+
+    Plain path prefixes go into a character trie, so checking a URL walks its path once
+    whatever the number of rules; rules with `*` or a trailing `$` are compiled to regexes.
+    As in RFC 9309 the longest matching rule wins and Allow wins a tie; no match means
+    allowed.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, bool]] = (), crawl_delay: float | None = None) -> None:
+        self.crawl_delay = crawl_delay
+        # Verdict for an unreachable robots.txt, cached only briefly
+        self.unreachable = False
+        self._trie: Dict[str, Any] = {}
+        self._wildcards: List[Tuple[Pattern[str], int, bool]] = []
+        self._disallow_all = False
+        for pattern, allow in rules:
+            if "*" in pattern or pattern.endswith("$"):
+                self._wildcards.append((self._compile(pattern), len(pattern), allow))
+                continue
+            node = self._trie
+            for ch in pattern:
+                node = node.setdefault(ch, {})
+            # Allow wins when the same path is both allowed and disallowed
+            node[""] = node.get("", False) or allow
+
+    @classmethod
+    def allow_all(cls) -> "RobotsRules":
+        return cls()
+
+    @classmethod
+    def disallow_all(cls) -> "RobotsRules":
+        rules = cls()
+        rules._disallow_all = True
+        return rules
+
+    @classmethod
+    def unreachable_host(cls) -> "RobotsRules":
+        rules = cls.disallow_all()
+        rules.unreachable = True
+        return rules
+
+    @staticmethod
+    def _compile(pattern: str) -> Pattern[str]:
+        anchored = pattern.endswith("$")
+        body = pattern[:-1] if anchored else pattern
+        regex = ".*".join(re.escape(part) for part in body.split("*"))
+        return re.compile(regex + ("$" if anchored else ""))
+
+    def allowed(self, path: str) -> bool:
+        if path == "/robots.txt":
+            return True
+        if self._disallow_all:
+            return False
+        best_len, best_allow = -1, True
+        node = self._trie
+        if "" in node:
+            best_len, best_allow = 0, node[""]
+        for i, ch in enumerate(path):
+            node = node.get(ch)
+            if node is None:
+                break
+            if "" in node:
+                best_len, best_allow = i + 1, node[""]
+        for regex, length, allow in self._wildcards:
+            if (length > best_len or (length == best_len and allow)) and regex.match(path):
+                best_len, best_allow = length, allow
+        return best_allow
+
+
+def _product_token(agent: str) -> str:
+    return agent.split("/", 1)[0].strip().lower()
+
+
+def parse_robots(text: str, agent: str) -> RobotsRules:
+    """Rules of the groups naming `agent` (case-insensitive), or of the `*` groups if none does.
+
+    As in RFC 9309 a group applies when its user-agent equals our product token (the part
+    of `agent` before any `/version`); `crawl` does not name `crawl4ai`.
+    """
+    token = _product_token(agent)
+    groups: List[Tuple[List[str], List[Tuple[str, bool]], List[float]]] = []
+    agents: List[str] = []
+    rules: List[Tuple[str, bool]] = []
+    delays: List[float] = []
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, value = (part.strip() for part in line.split(":", 1))
+        key = key.lower()
+        if key == "user-agent":
+            if rules or delays:
+                # A user-agent line after rules starts a new group
+                groups.append((agents, rules, delays))
+                agents, rules, delays = [], [], []
+            agents.append(_product_token(value))
+        elif key in ("allow", "disallow") and agents:
+            # An empty Disallow allows everything, so it adds no rule
+            if value:
+                rules.append((value, key == "allow"))
+        elif key == "crawl-delay" and agents:
+            try:
+                delays.append(max(0.0, float(value)))
+            except ValueError:
+                pass
+    if agents:
+        groups.append((agents, rules, delays))
+
+    selected = [g for g in groups if any(a != "*" and a == token for a in g[0])]
+    if not selected:
+        selected = [g for g in groups if "*" in g[0]]
+    merged_rules = [r for g in selected for r in g[1]]
+    merged_delays = [d for g in selected for d in g[2]]
+    return RobotsRules(merged_rules, crawl_delay=max(merged_delays) if merged_delays else None)
+
+
+def _origin(url: str) -> str:
+    p = urlparse(url)
+    return f"{p.scheme}://{p.netloc.lower()}"
+
+
+def _path_of(url: str) -> str:
+    p = urlparse(url)
+    return (p.path or "/") + (f"?{p.query}" if p.query else "")
+
+
+class RobotsCache:
+    """Per-host robots.txt rules, fetched once and kept for `ttl_s` seconds.
+
+    Concurrent lookups for a host share one fetch. Following RFC 9309, a 4xx robots.txt
+    means everything is allowed and an unreachable one (5xx or network error) means
+    nothing is; that verdict is only kept for `failure_ttl_s`, so a transient outage does
+    not block the host for the full TTL. Shared by every tool call, so repeat runs
+    against a host skip the fetch.
+    """
+
+    def __init__(
+        self,
+        agent: str = "crawl4ai",
+        ttl_s: float = 3600.0,
+        client: httpx.AsyncClient | None = None,
+        failure_ttl_s: float = 60.0,
+    ) -> None:
+        self.agent = agent
+        self.ttl_s = ttl_s
+        self.failure_ttl_s = min(failure_ttl_s, ttl_s)
+        self._client = client
+        self._rules: Dict[str, Tuple[float, RobotsRules]] = {}
+        self._lookups: Dict[str, asyncio.Task[RobotsRules]] = {}
+
+    @classmethod
+    def from_env(cls) -> "RobotsCache":
+        return cls(
+            agent=os.getenv("CRAWL4AI_MCP_ROBOTS_AGENT", "crawl4ai"),
+            ttl_s=_env_float("CRAWL4AI_MCP_ROBOTS_TTL_S", 3600.0),
+            failure_ttl_s=_env_float("CRAWL4AI_MCP_ROBOTS_FAILURE_TTL_S", 60.0),
+        )
+
+    async def _fetch(self, origin: str) -> RobotsRules:
+        client = self._client or shared_http_client()
+        try:
+            async with client.stream("GET", f"{origin}/robots.txt") as r:
+                if r.status_code >= 500:
+                    return RobotsRules.unreachable_host()
+                if r.status_code >= 400:
+                    return RobotsRules.allow_all()
+                body = b""
+                async for chunk in r.aiter_bytes():
+                    body += chunk
+                    if len(body) >= _MAX_ROBOTS_BYTES:
+                        break
+                encoding = r.encoding or "utf-8"
+        except httpx.HTTPError:
+            return RobotsRules.unreachable_host()
+        return parse_robots(body[:_MAX_ROBOTS_BYTES].decode(encoding, errors="replace"), self.agent)
+
+    async def rules_for(self, url: str) -> RobotsRules:
+        origin = _origin(url)
+        cached = self._rules.get(origin)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        task = self._lookups.get(origin)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(origin))
+            self._lookups[origin] = task
+        try:
+            rules = await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._lookups.pop(origin, None)
+        if len(self._rules) >= _MAX_CACHED_HOSTS:
+            self._rules.pop(next(iter(self._rules)))
+        ttl = self.failure_ttl_s if rules.unreachable else self.ttl_s
+        self._rules[origin] = (time.monotonic() + ttl, rules)
+        return rules
+
+    async def allowed(self, url: str) -> bool:
+        return (await self.rules_for(url)).allowed(_path_of(url))
+
+    async def crawl_delay(self, origin: str) -> float | None:
+        """`Crawl-delay` for HostScheduler's lookup hook."""
+        return (await self.rules_for(origin)).crawl_delay
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import xml.etree.ElementTree as ET
+import zlib
+from typing import Callable, Iterable, Set
+
+import httpx
+
+from .http_client import shared_http_client
+from .safety import is_public_http_url
+from .sitemap_utils import SitemapEntry, SitemapParser
+
+
+logger = logging.getLogger("crawl4ai_mcp")
+
+# sitemaps.org caps a sitemap file at 50 MB uncompressed
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+
+class SitemapStream:
+    """Page entries of a sitemap, expanding sitemap indexes recursively as they are found.
+
+    The root sitemap and every child sitemap are fetched by background tasks (at most
+    `concurrency` at once, over the shared pooled client) and parsed while their bytes stream in,
+    gzipped or not. Page entries go into a bounded queue as soon as they are parsed, so the
+    crawl starts before any document has finished downloading; a full queue pauses the
+    downloads, which keeps memory bounded on sitemaps of any size. Child sitemaps
+    deeper than `max_depth` levels below the root, or beyond `max_sitemaps` documents in
+    total, are skipped.
+
+    Page entries run through parse -> `accept` filter -> dedupe -> `skip` -> `limit`: only
+    URLs the filter accepts are remembered (by `key`, e.g. their canonical form), each at
+    most once; keys in `seen` count as already remembered. Entries `skip` returns True for
+    (e.g. unchanged since the last run) are dropped without counting toward the limit, and
+    as soon as `limit` entries have been queued the stream stops, aborting the downloads
+    still in progress and never fetching the child sitemaps not yet started.
+    """
+
+    def __init__(
+        self,
+        root_url: str,
+        client: httpx.AsyncClient | None = None,
+        max_depth: int = 3,
+        max_sitemaps: int = 500,
+        concurrency: int = 4,
+        max_buffered: int = 1024,
+        max_document_bytes: int = SITEMAP_MAX_BYTES,
+        accept: Callable[[str], bool] | None = None,
+        limit: int | None = None,
+        key: Callable[[str], str] | None = None,
+        skip: Callable[[SitemapEntry], bool] | None = None,
+        seen: Iterable[str] = (),
+    ) -> None:
+        self.root_url = root_url
+        self.max_depth = max_depth
+        self.max_sitemaps = max_sitemaps
+        self.max_document_bytes = max_document_bytes
+        self.limit = limit
+        self._accept = accept
+        self._key = key or (lambda url: url)
+        self._skip = skip
+        self._client = client
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self._out: asyncio.Queue[SitemapEntry | None] = asyncio.Queue(maxsize=max(1, max_buffered))
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self._sitemaps_seen: Set[str] = set()
+        self._urls_seen: Set[str] = set(seen)
+        self._runner: asyncio.Task[None] | None = None
+        self._exhausted = False
+        self._stopped = False
+        self.emitted = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.sitemaps_fetched = 0
+        self.sitemaps_failed = 0
+        self.sitemaps_skipped = 0
+
+    def start(self) -> None:
+        if self._client is None:
+            self._client = shared_http_client()
+        self._schedule(self.root_url, 0)
+        self._runner = asyncio.ensure_future(self._run())
+
+    def ready(self) -> int:
+        """Entries that `next` can return without waiting."""
+        return self._out.qsize()
+
+    async def next(self) -> SitemapEntry | None:
+        """Next page entry, waiting for downloads if needed; None once every sitemap is done."""
+        if self._exhausted:
+            return None
+        entry = await self._out.get()
+        if entry is None:
+            self._exhausted = True
+        return entry
+
+    async def aclose(self) -> None:
+        tasks = list(self._tasks)
+        if self._runner is not None:
+            tasks.append(self._runner)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "sitemaps_fetched": self.sitemaps_fetched,
+            "sitemaps_failed": self.sitemaps_failed,
+            "sitemaps_skipped": self.sitemaps_skipped,
+            "urls": self.emitted,
+            "urls_rejected": self.rejected,
+            "urls_skipped": self.skipped,
+            "stopped_at_limit": self._stopped,
+        }
+
+    def _schedule(self, url: str, depth: int) -> None:
+        if self._stopped or url in self._sitemaps_seen:
+            return
+        if depth > self.max_depth or len(self._sitemaps_seen) >= self.max_sitemaps or not is_public_http_url(url):
+            self.sitemaps_skipped += 1
+            return
+        self._sitemaps_seen.add(url)
+        task = asyncio.ensure_future(self._expand(url, depth))
+        self._tasks.add(task)
+
+    async def _run(self) -> None:
+        while self._tasks:
+            # Children scheduled meanwhile are picked up on the next round
+            done, _ = await asyncio.wait(set(self._tasks), return_when=asyncio.FIRST_COMPLETED)
+            self._tasks.difference_update(done)
+            for task in done:
+                if task.exception() is not None:
+                    self.sitemaps_failed += 1
+                    logger.warning("sitemap expansion failed: %s", str(task.exception()))
+        await self._out.put(None)
+
+    async def _emit(self, entry: SitemapEntry, depth: int) -> bool:
+        """Queue or schedule one parsed entry; False once the stream has reached its limit."""
+        if self._stopped:
+            return False
+        if entry.is_sitemap:
+            self._schedule(entry.loc, depth + 1)
+            return True
+        if self._accept is not None and not self._accept(entry.loc):
+            self.rejected += 1
+            return True
+        key = self._key(entry.loc)
+        if key in self._urls_seen:
+            return True
+        self._urls_seen.add(key)
+        if self._skip is not None and self._skip(entry):
+            self.skipped += 1
+            return True
+        self.emitted += 1
+        if self.limit is not None and self.emitted >= self.limit:
+            self._stopped = True
+        await self._out.put(entry)
+        return not self._stopped
+
+    async def _expand(self, url: str, depth: int) -> None:
+        assert self._client is not None
+        parser = SitemapParser()
+        try:
+            async with self._sem:
+                if self._stopped:
+                    return
+                async with self._client.stream("GET", url) as r:
+                    if r.status_code != 200:
+                        self.sitemaps_failed += 1
+                        return
+                    async for chunk in r.aiter_bytes():
+                        for entry in parser.feed(chunk):
+                            if not await self._emit(entry, depth):
+                                return
+                        if parser.bytes_in > self.max_document_bytes:
+                            logger.warning("sitemap truncated at %d bytes url=%s", parser.bytes_in, url)
+                            break
+                    else:
+                        for entry in parser.close():
+                            if not await self._emit(entry, depth):
+                                return
+        except (httpx.HTTPError, ET.ParseError, zlib.error) as e:
+            # Entries parsed before the error have already been queued
+            logger.warning("sitemap fetch failed url=%s: %s", url, str(e))
+            self.sitemaps_failed += 1
+            return
+        self.sitemaps_fetched += 1
@@ -1,19 +1,20 @@
 from __future__ import annotations
 
-import re
 import xml.etree.ElementTree as ET
-from typing import Iterable, List
-from urllib.parse import urljoin, urlparse
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterator, List
+from urllib.parse import urlparse
 
-import httpx
+from .http_client import shared_http_client
 
 
 async def fetch_text(url: str, timeout: float = 10.0) -> str | None:
     try:
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            r = await client.get(url)
-            if r.status_code == 200:
-                return r.text
+        r = await shared_http_client().get(url, timeout=timeout)
+        if r.status_code == 200:
+            return r.text
     except Exception:
         return None
     return None
@@ -36,41 +37,115 @@ async def discover_sitemaps(entry_url: str) -> List[str]:
     return sitemaps
 
 
-def parse_sitemap_xml(xml_text: str) -> List[str]:
+@dataclass
+class SitemapEntry:
+    loc: str
+    lastmod: str | None = None
+    changefreq: str | None = None
+    priority: float | None = None
+    is_sitemap: bool = False  # <sitemap> entry of a sitemap index, not a page
+
+
+def parse_lastmod(value: str | None) -> datetime | None:
+    """Parse a W3C datetime (`2024-05-01`, `2024-05-01T10:00:00Z`, ...) as an aware UTC datetime."""
+    if not value:
+        return None
     try:
-        root = ET.fromstring(xml_text)
-    except ET.ParseError:
-        return []
-    ns = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-    urls: List[str] = []
-    # urlset
-    for url in root.findall(".//sm:url", ns):
-        loc = url.find("sm:loc", ns)
-        if loc is not None and loc.text:
-            urls.append(loc.text.strip())
-    # sitemapindex -> nested urlsets (optional)
-    for sub in root.findall(".//sm:sitemap", ns):
-        loc = sub.find("sm:loc", ns)
-        if loc is not None and loc.text:
-            urls.append(loc.text.strip())
-    return urls
-
-
-def filter_urls(urls: Iterable[str], include_patterns: List[str], exclude_patterns: List[str]) -> List[str]:
-    def matches_any(patterns: List[str], text: str) -> bool:
-        for p in patterns:
-            try:
-                if re.search(p, text):
-                    return True
-            except re.error:
+        dt = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+_SM_NS = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+
+
+def _child_text(el: ET.Element, tag: str) -> str | None:
+    child = el.find(f"sm:{tag}", _SM_NS)
+    if child is None or not child.text:
+        return None
+    return child.text.strip() or None
+
+
+def _entry_from_element(el: ET.Element, is_sitemap: bool) -> SitemapEntry | None:
+    loc = _child_text(el, "loc")
+    if not loc:
+        return None
+    priority: float | None = None
+    raw_priority = _child_text(el, "priority")
+    if raw_priority is not None:
+        try:
+            priority = float(raw_priority)
+        except ValueError:
+            priority = None
+    return SitemapEntry(
+        loc=loc,
+        lastmod=_child_text(el, "lastmod"),
+        changefreq=_child_text(el, "changefreq"),
+        priority=priority,
+        is_sitemap=is_sitemap,
+    )
+
+
+_URL_TAG = "{%s}url" % _SM_NS["sm"]
+_SITEMAP_TAG = "{%s}sitemap" % _SM_NS["sm"]
+_GZIP_MAGIC = b"\x1f\x8b"
+_INFLATE_CHUNK = 64 * 1024
+
+
+class SitemapParser:
+    """Incremental sitemap parser: feed raw bytes as they arrive, get entries as they complete.
+
+    gzip input (`.xml.gz` sitemaps served without Content-Encoding) is detected by its magic
+    bytes and inflated on the fly in bounded chunks. Each finished <url>/<sitemap> element is
+    turned into a SitemapEntry and dropped from the tree, so memory stays flat however many
+    entries the document holds. `bytes_in` counts the decompressed XML fed so far.
+    """
+
+    def __init__(self) -> None:
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: ET.Element | None = None
+        self._gunzip: Any = None
+        self._sniffed = False
+        self.bytes_in = 0
+
+    def feed(self, chunk: bytes | str) -> Iterator[SitemapEntry]:
+        if not self._sniffed:
+            self._sniffed = True
+            if isinstance(chunk, bytes) and chunk[:2] == _GZIP_MAGIC:
+                self._gunzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._gunzip is None:
+            yield from self._feed_xml(chunk)
+            return
+        data = self._gunzip.decompress(chunk, _INFLATE_CHUNK)
+        while data:
+            yield from self._feed_xml(data)
+            if not self._gunzip.unconsumed_tail:
+                break
+            data = self._gunzip.decompress(self._gunzip.unconsumed_tail, _INFLATE_CHUNK)
+
+    def close(self) -> Iterator[SitemapEntry]:
+        self._parser.close()
+        yield from self._drain()
+
+    def _feed_xml(self, data: bytes | str) -> Iterator[SitemapEntry]:
+        self.bytes_in += len(data)
+        self._parser.feed(data)
+        yield from self._drain()
+
+    def _drain(self) -> Iterator[SitemapEntry]:
+        for event, el in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = el
+                continue
+            if el.tag not in (_URL_TAG, _SITEMAP_TAG):
                 continue
-        return False
-
-    filtered: List[str] = []
-    for u in urls:
-        if include_patterns and not matches_any(include_patterns, u):
-            continue
-        if exclude_patterns and matches_any(exclude_patterns, u):
-            continue
-        filtered.append(u)
-    return filtered
+            entry = _entry_from_element(el, el.tag == _SITEMAP_TAG)
+            # Finished entries are detached so the tree never grows past one element
+            if self._root is not None:
+                self._root.clear()
+            if entry is not None:
+                yield entry
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Pattern, Tuple
+
+from .safety import is_public_http_url
+
+
+_MAX_CACHED_ORIGINS = 10_000
+_ORIGIN_RE = re.compile(r"^([A-Za-z][A-Za-z0-9+.-]*)://([^/?#]*)")
+_HOST_RE = re.compile(r"^(?:[^@]*@)?(\[[^\]]*\]|[^:]*)")
+_REGEX_META = frozenset(".^$*+?{}[]|()")
+# Patterns that change meaning or fail to compile inside a combined alternation
+_UNSAFE_TO_COMBINE_RE = re.compile(r"\\[1-9]|\(\?P[<=]|\(\?[aiLmsux]+\)")
+
+
+def _literal_prefix(pattern: str) -> str | None:
+    """The text a `^literal` pattern matches as a prefix, or None if it is a real regex."""
+    if not pattern.startswith("^"):
+        return None
+    out: List[str] = []
+    chars = iter(pattern[1:])
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, None)
+            # \d, \w, \b ... are classes or assertions, not escaped literals
+            if nxt is None or nxt.isalnum():
+                return None
+            out.append(nxt)
+        elif ch in _REGEX_META:
+            return None
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+class _PatternSet:
+    """Answers "does any of these patterns `re.search` this URL?" with one pass per URL.
+
+    `^literal` patterns go into a character trie walked once along the URL; the other
+    patterns are joined into one alternation regex. Patterns that cannot be joined safely
+    (backreferences, named groups, inline global flags) are kept as separate regexes, and
+    invalid patterns are ignored.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self._trie: Dict[str, Any] = {}
+        self._has_prefixes = False
+        combinable: List[str] = []
+        self._separate: List[Pattern[str]] = []
+        for p in patterns:
+            try:
+                compiled = re.compile(p)
+            except re.error:
+                continue
+            prefix = _literal_prefix(p)
+            if prefix is not None:
+                node = self._trie
+                for ch in prefix:
+                    node = node.setdefault(ch, {})
+                node[""] = True
+                self._has_prefixes = True
+            elif _UNSAFE_TO_COMBINE_RE.search(p):
+                self._separate.append(compiled)
+            else:
+                combinable.append(p)
+        self._combined: Pattern[str] | None = None
+        if combinable:
+            try:
+                self._combined = re.compile("|".join(f"(?:{p})" for p in combinable))
+            except re.error:
+                self._separate.extend(re.compile(p) for p in combinable)
+        self.empty = not (self._has_prefixes or combinable or self._separate)
+
+    def _prefix_match(self, url: str) -> bool:
+        node = self._trie
+        if "" in node:
+            return True
+        for ch in url:
+            node = node.get(ch)
+            if node is None:
+                return False
+            if "" in node:
+                return True
+        return False
+
+    def search(self, url: str) -> bool:
+        if self._has_prefixes and self._prefix_match(url):
+            return True
+        if self._combined is not None and self._combined.search(url):
+            return True
+        return any(p.search(url) for p in self._separate)
+
+
+class UrlFilter:
+    """Include/exclude, same-domain and public-URL checks for discovered URLs, built once per run.
+
+    Include and exclude patterns keep their `re.search` semantics (an empty include list
+    accepts everything; invalid patterns are ignored) but are compiled once into a
+    `_PatternSet` each. The checks that only depend on the origin (public http(s) host,
+    same domain as the seed) are cached per `scheme://netloc`, so each link costs a regex
+    match and a dict lookup instead of a URL parse plus IP address parsing.
+    """
+
+    def __init__(
+        self,
+        include_patterns: Iterable[str] = (),
+        exclude_patterns: Iterable[str] = (),
+        seed_host: str | None = None,
+        same_domain_only: bool = False,
+        require_public: bool = True,
+    ) -> None:
+        self._include = _PatternSet(include_patterns)
+        self._exclude = _PatternSet(exclude_patterns)
+        self._seed_host = (seed_host or "").lower()
+        self._same_domain_only = same_domain_only and bool(seed_host)
+        self._require_public = require_public
+        self._origins: Dict[Tuple[str, str], bool] = {}
+
+    def _origin_allowed(self, scheme: str, netloc: str) -> bool:
+        key = (scheme, netloc)
+        verdict = self._origins.get(key)
+        if verdict is None:
+            verdict = True
+            if self._require_public and not is_public_http_url(f"{scheme}://{netloc}/"):
+                verdict = False
+            elif self._same_domain_only:
+                host = _HOST_RE.match(netloc).group(1).strip("[]").lower()  # type: ignore[union-attr]
+                verdict = not host or host == self._seed_host
+            if len(self._origins) >= _MAX_CACHED_ORIGINS:
+                self._origins.clear()
+            self._origins[key] = verdict
+        return verdict
+
+    def allowed(self, url: str) -> bool:
+        if self._require_public or self._same_domain_only:
+            m = _ORIGIN_RE.match(url)
+            if m is None:
+                if self._require_public:
+                    return False
+            elif not self._origin_allowed(m.group(1).lower(), m.group(2)):
+                return False
+        if not self._include.empty and not self._include.search(url):
+            return False
+        if not self._exclude.empty and self._exclude.search(url):
+            return False
+        return True
+
+    def filter(self, urls: Iterable[str]) -> List[str]:
+        """The URLs of `urls` that pass, in order; one call per page's link list."""
+        allowed = self.allowed
+        return [u for u in urls if allowed(u)]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Iterable
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+
+# Query parameters that only carry campaign/click tracking; a trailing `*` matches a prefix
+DEFAULT_STRIP_PARAMS = (
+    "utm_*",
+    "gclid",
+    "dclid",
+    "gbraid",
+    "wbraid",
+    "fbclid",
+    "msclkid",
+    "yclid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "igshid",
+)
+
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+_PCT_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+_PATH_SAFE = "/:@!$&'()*+,;=-._~%"
+_LINK_TAG_RE = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+# rel is a space-separated list of tokens; data-rel / data-href are other attributes
+_REL_RE = re.compile(r"(?<![\w-])rel\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'>]+))", re.IGNORECASE)
+_HREF_RE = re.compile(r"(?<![\w-])href\s*=\s*[\"']?([^\"'\s>]+)", re.IGNORECASE)
+
+
+def _normalize_escapes(text: str, safe: str) -> str:
+    """Decode escaped unreserved characters, upper-case the other escapes, escape what must be."""
+
+    def fix(m: re.Match[str]) -> str:
+        ch = chr(int(m.group(1), 16))
+        return ch if ch in _UNRESERVED else "%" + m.group(1).upper()
+
+    return quote(_PCT_RE.sub(fix, text), safe=safe)
+
+
+def _remove_dot_segments(path: str) -> str:
+    out: list[str] = []
+    for seg in path.split("/"):
+        if seg == "..":
+            if len(out) > 1:
+                out.pop()
+        elif seg != ".":
+            out.append(seg)
+    result = "/".join(out)
+    if path.endswith(("/.", "/..")):
+        result += "/"
+    return result or "/"
+
+
+class UrlCanonicalizer:
+    """Maps the many spellings of a URL to one key for visited sets and frontier checks.
+
+    Lower-cases scheme and host, drops default ports and the fragment, resolves `.`/`..`
+    segments, normalizes percent-encoding, removes tracking parameters (`strip_params`,
+    `utm_*`-style prefixes allowed), sorts the query by parameter name and, unless
+    disabled, drops a trailing slash. The key is for deduplication; pages are still
+    fetched at the URL they were linked as.
+    """
+
+    def __init__(self, strip_params: Iterable[str] = DEFAULT_STRIP_PARAMS, strip_trailing_slash: bool = True) -> None:
+        names = [p.lower() for p in strip_params]
+        self._strip_exact = frozenset(p for p in names if not p.endswith("*"))
+        self._strip_prefixes = tuple(p[:-1] for p in names if p.endswith("*"))
+        self.strip_trailing_slash = strip_trailing_slash
+        self.key = lru_cache(maxsize=65536)(self._canonicalize)
+
+    def __call__(self, url: str) -> str:
+        return self.key(url)
+
+    def _stripped(self, name: str) -> bool:
+        name = name.lower()
+        return name in self._strip_exact or name.startswith(self._strip_prefixes)
+
+    def _canonicalize(self, url: str) -> str:
+        try:
+            parts = urlsplit(url.strip())
+            port = parts.port
+        except ValueError:
+            return url
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").rstrip(".")
+        netloc = host if ":" not in host else f"[{host}]"
+        if port is not None and str(port) != _DEFAULT_PORTS.get(scheme):
+            netloc += f":{port}"
+        if parts.username is not None:
+            userinfo = parts.username + (f":{parts.password}" if parts.password is not None else "")
+            netloc = f"{userinfo}@{netloc}"
+
+        path = _remove_dot_segments(_normalize_escapes(parts.path or "/", _PATH_SAFE))
+        if self.strip_trailing_slash and len(path) > 1 and path.endswith("/"):
+            path = path.rstrip("/") or "/"
+
+        query = ""
+        if parts.query:
+            pairs = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not self._stripped(k)]
+            pairs.sort(key=lambda kv: kv[0])
+            query = urlencode(pairs, quote_via=quote, safe="-._~")
+        return urlunsplit((scheme, netloc, path, query, ""))
+
+
+@lru_cache(maxsize=1)
+def default_canonicalizer() -> UrlCanonicalizer:
+    return UrlCanonicalizer()
+
+
+def canonicalize_url(url: str) -> str:
+    """Canonical key of `url` with the default settings."""
+    return default_canonicalizer()(url)
+
+
+def declared_canonical(html: str) -> str | None:
+    """href of the page's `<link rel="canonical">`, if it declares one."""
+    if not html:
+        return None
+    for tag in _LINK_TAG_RE.finditer(html):
+        rel = _REL_RE.search(tag.group(0))
+        if rel is None or "canonical" not in (rel.group(1) or rel.group(2) or rel.group(3) or "").lower().split():
+            continue
+        href = _HREF_RE.search(tag.group(0))
+        return href.group(1) if href else None
+    return None